@@ -0,0 +1,62 @@
+import random
+from typing import Dict, List
+
+from sqlalchemy import insert
+
+from benchmarks.fakes import FakeGuild, FakeMember
+from modals.bank import Bank
+from modals.currency import Currency
+from modals.settings import Settings
+
+CHUNK_SIZE = 5000
+FIRST_USER_ID = 1000
+
+
+def currency_names(currencies: int) -> List[str]:
+    return [f"currency{index}" for index in range(currencies)]
+
+
+def build_guilds(guilds: int, members: int) -> List[FakeGuild]:
+    return [
+        FakeGuild(
+            guild_id,
+            [FakeMember(FIRST_USER_ID + index) for index in range(members)],
+        )
+        for guild_id in range(1, guilds + 1)
+    ]
+
+
+async def seed(bot, guilds: List[FakeGuild], currencies: int, rng: random.Random):
+    # Every member of every guild holds every currency, so the table has
+    # guilds x currencies x members rows.
+    await bot.init_database()
+    names = currency_names(currencies)
+    async with bot.engine.begin() as conn:
+        for guild in guilds:
+            await conn.execute(
+                insert(Settings).values(
+                    guild_id=guild.id, dice_win=50, min_bet=1, max_bet=1_000_000
+                )
+            )
+            ids: Dict[str, int] = {}
+            for name in names:
+                currency_id = await conn.execute(
+                    insert(Currency)
+                    .values(guild_id=guild.id, name=name)
+                    .returning(Currency.id)
+                )
+                ids[name] = currency_id.scalar_one()
+            rows = [
+                {
+                    "guild_id": guild.id,
+                    "currency_id": currency_id,
+                    "user_id": member.id,
+                    "amount": rng.randrange(1_000, 10_000_000),
+                }
+                for currency_id in ids.values()
+                for member in guild.members
+            ]
+            for start in range(0, len(rows), CHUNK_SIZE):
+                await conn.execute(insert(Bank), rows[start:start + CHUNK_SIZE])
+    await bot.settings.load()
+    await bot.currencies.load()
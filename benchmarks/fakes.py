@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional
+
+
+# Just enough of discord.Interaction, Guild and Member for the cog handlers
+# to run without a gateway or HTTP connection.  Everything they send is
+# kept on the interaction instead.
+class FakeMember:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"member{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.roles: List[object] = []
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return self.id
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, members: List[FakeMember]):
+        self.id = guild_id
+        self.icon = None
+        self.chunked = True
+        self.members = members
+        self._members: Dict[int, FakeMember] = {member.id: member for member in members}
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self._members.get(user_id)
+
+
+class FakeMessage:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def edit(self, **kwargs):
+        self.interaction.sent.append(kwargs)
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.sent.append(dict(kwargs, content=content))
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        self.interaction.sent.append(kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.sent.append(dict(kwargs, content=content))
+        return FakeMessage(self.interaction)
+
+
+class FakeInteraction:
+    def __init__(self, client, guild: FakeGuild, user: FakeMember):
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = None
+        self.command = None
+        self.extras: dict = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.sent: List[dict] = []
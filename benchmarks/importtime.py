@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+# What the bot imports before it can connect: the bot class and every cog.
+TARGETS = ["currency_bot"] + [
+    f"cogs.{file[:-3]}"
+    for file in sorted(os.listdir(os.path.join(ROOT, "cogs")))
+    if file.endswith(".py") and "template" not in file and file != "__init__.py"
+]
+# The dependencies every startup pays for.  They are imported first in the
+# same interpreter and budgets are the bot's own import time as a ratio to
+# theirs, so a faster or slower host moves both sides alike.
+BASELINE = ["discord", "discord.ext.commands", "sqlalchemy.ext.asyncio", "aiosqlite"]
+MARK = "--- bot imports start here"
+# Optional or heavy modules that must only load when actually used.
+LAZY = ["docker", "aiohttp.web", "argparse"]
+# Small modules get absolute headroom, or timer noise alone would fail them.
+MIN_HEADROOM_MS = 5
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure() -> Tuple[float, Dict[str, float], List[str]]:
+    # One fresh interpreter per run; -X importtime reports microseconds.
+    # __import__ rather than importlib, which bypasses the importtime log.
+    code = "".join(f"__import__({module!r})\n" for module in BASELINE)
+    code += f"import sys\nsys.stderr.write({MARK!r} + '\\n')\n"
+    code += "".join(f"__import__({target!r})\n" for target in TARGETS)
+    code += "print('\\n'.join(sys.modules))\n"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Import failed:\n{result.stderr[-2000:]}")
+    before, after = result.stderr.split(MARK)
+    # Only top-level lines, since nested ones are part of their parent's time.
+    baseline = sum(
+        int(match.group(2)) / 1000
+        for match in LINE.finditer(before)
+        if len(match.group(3)) == 1
+    )
+    cumulative: Dict[str, float] = {}
+    for match in LINE.finditer(after):
+        _, total, _, module = match.groups()
+        if module in TARGETS:
+            cumulative[module] = int(total) / 1000
+    # Modules import each other, so the sum of the targets is not wall time;
+    # the total is every top-level import the bot added on top of BASELINE.
+    cumulative["total"] = sum(
+        int(match.group(2)) / 1000
+        for match in LINE.finditer(after)
+        if len(match.group(3)) == 1
+    )
+    return baseline, cumulative, result.stdout.split()
+
+
+def packages(modules: List[str]) -> List[str]:
+    # Third-party and first-party top-level packages; a new one means the
+    # bot picked up another import at startup.
+    names = {module.split(".")[0] for module in modules}
+    return sorted(
+        name
+        for name in names
+        if name not in sys.stdlib_module_names and not name.startswith("_")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail when the bot's own import time grows relative to "
+        "its dependencies', or when startup imports a new package."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=BUDGET)
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Write the measured ratios, plus headroom, and the imported "
+        "packages as the new budget.  Run it after an intended change.",
+    )
+    parser.add_argument("--headroom", type=float, default=1.5)
+    args = parser.parse_args()
+
+    runs = []
+    baselines = []
+    for _ in range(args.runs):
+        baseline, cumulative, modules = measure()
+        baselines.append(baseline)
+        runs.append(cumulative)
+    baseline = statistics.median(baselines)
+    medians = {
+        name: statistics.median(run.get(name, 0) for run in runs) for name in runs[0]
+    }
+    ratios = {
+        name: statistics.median(
+            run.get(name, 0) / base for run, base in zip(runs, baselines)
+        )
+        for name in runs[0]
+    }
+    eager = [module for module in LAZY if module in modules]
+    imported = packages(modules)
+
+    if args.update:
+        with open(args.budget, "w") as f:
+            json.dump(
+                {
+                    "ratios": {
+                        name: round(
+                            max(ratio * args.headroom, ratio + MIN_HEADROOM_MS / baseline),
+                            4,
+                        )
+                        for name, ratio in ratios.items()
+                    },
+                    "packages": imported,
+                },
+                f,
+                indent=4,
+            )
+        print(f"Budget written to {args.budget}")
+        return
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+    failed = False
+    print(f"{'dependencies':<24} {baseline:>8.1f}ms")
+    for name, ms in sorted(medians.items(), key=lambda item: -item[1]):
+        limit = budget["ratios"].get(name)
+        over = limit is not None and ratios[name] > limit
+        failed |= over
+        print(
+            f"{name:<24} {ms:>8.1f}ms  {ratios[name]:.4f}x  "
+            f"budget {limit}x{'  OVER' if over else ''}"
+        )
+    new = [name for name in imported if name not in budget["packages"]]
+    for name in new:
+        print(f"{name} is a new package imported at startup")
+    for module in eager:
+        print(f"{module} is imported at startup but should load lazily")
+    if failed or new or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from benchmarks.run import SCENARIOS, Bench, percentile, prepare
+from services.locks import AccountLocks
+
+# Share of each command in synthetic traffic, roughly a busy bet channel.
+DEFAULT_MIX = {
+    "dice": 45,
+    "give_gold": 10,
+    "balance": 15,
+    "leaderboard": 10,
+    "autocomplete": 20,
+}
+
+Event = Tuple[float, str]
+
+
+class TimedAccountLocks(AccountLocks):
+    def __init__(self, stripes: int):
+        super().__init__(stripes)
+        self.waits: List[float] = []
+
+    @asynccontextmanager
+    async def hold(self, *accounts):
+        start = time.perf_counter()
+        async with super().hold(*accounts):
+            self.waits.append(time.perf_counter() - start)
+            yield
+
+
+class WriteTimer:
+    # Time spent in INSERT/UPDATE/DELETE statements.  With busy_timeout set,
+    # SQLite waits for the writer lock inside the statement, so this is where
+    # lock contention between connections shows up.
+    def __init__(self, engine):
+        self.times: List[float] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["write_start"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("write_start", None)
+        if start is not None and statement.lstrip()[:6].upper() in (
+            "INSERT",
+            "UPDATE",
+            "DELETE",
+        ):
+            self.times.append(time.perf_counter() - start)
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, int]:
+    if not value:
+        return DEFAULT_MIX
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown command in --mix: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+def synthetic(rate: float, duration: float, mix: Dict[str, int], rng: random.Random):
+    # Poisson arrivals at `rate` per second.
+    names, weights = list(mix), list(mix.values())
+    events: List[Event] = []
+    at = rng.expovariate(rate)
+    while at < duration:
+        events.append((at, rng.choices(names, weights)[0]))
+        at += rng.expovariate(rate)
+    return events
+
+
+def load_recording(path: str, speed: float) -> List[Event]:
+    events = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                events.append((entry["at"] / speed, entry["command"]))
+    return events
+
+
+def save_recording(path: str, events: List[Event]):
+    with open(path, "w") as f:
+        for at, command in events:
+            f.write(json.dumps({"at": round(at, 6), "command": command}) + "\n")
+
+
+def classify(error: Exception) -> str:
+    if "database is locked" in str(error):
+        return "database is locked"
+    return type(error).__name__
+
+
+def milliseconds(values: List[float]) -> dict:
+    if len(values) < 2:
+        return {"count": len(values)}
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "count": len(values),
+        "total_ms": round(sum(values) * 1000, 1),
+        "p50_ms": percentile(quantiles, 50),
+        "p99_ms": percentile(quantiles, 99),
+    }
+
+
+async def replay(
+    bench: Bench,
+    events: List[Event],
+    rng: random.Random,
+    max_in_flight: int,
+    drain: float,
+) -> dict:
+    # Open loop: commands start on their schedule whether or not earlier ones
+    # finished, and latency is measured from the scheduled start so queueing
+    # delay is not hidden.
+    locks: TimedAccountLocks = bench.bot.balances.locks
+    writes: WriteTimer = bench.write_timer
+    locks.waits.clear()
+    writes.times.clear()
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    in_flight: set = set()
+    dropped = 0
+
+    async def call(command: str, scheduled: float):
+        try:
+            await SCENARIOS[command](bench, rng)
+        except Exception as e:
+            errors[classify(e)] += 1
+        else:
+            latencies.append(time.perf_counter() - scheduled)
+
+    start = time.perf_counter()
+    for at, command in events:
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(call(command, start + at))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        _, pending = await asyncio.wait(set(in_flight), timeout=drain)
+        for task in pending:
+            task.cancel()
+        if pending:
+            errors["timed out"] += len(pending)
+    elapsed = time.perf_counter() - start
+    offered = events[-1][0] if events else 0
+    return {
+        "offered": len(events),
+        "offered_per_s": round(len(events) / offered, 1) if offered else 0,
+        "completed": len(latencies),
+        "completed_per_s": round(len(latencies) / elapsed, 1),
+        "dropped": dropped,
+        "errors": dict(errors),
+        "error_rate": round(sum(errors.values()) / len(events), 4) if events else 0,
+        "latency": milliseconds(latencies),
+        "account_lock_wait": milliseconds(locks.waits),
+        "db_write": milliseconds(writes.times),
+    }
+
+
+def saturated(stage: dict, slo_ms: float) -> bool:
+    latency = stage["latency"].get("p99_ms", 0)
+    return (
+        stage["completed_per_s"] < 0.95 * stage["offered_per_s"]
+        or latency > slo_ms
+        or stage["error_rate"] > 0.01
+    )
+
+
+async def run(args) -> dict:
+    config = {
+        "WRITE_BEHIND": args.write_behind,
+        "DATABASE_POOL_SIZE": args.pool_size,
+        "DATABASE_MAX_OVERFLOW": args.max_overflow,
+        "SQLITE_PRAGMAS": dict(pragma.split("=", 1) for pragma in args.pragma),
+    }
+    bench = await prepare(args, config)
+    bench.bot.balances.locks = TimedAccountLocks(args.lock_stripes)
+    bench.write_timer = WriteTimer(bench.bot.engine)
+    rng = random.Random(args.seed)
+    stages = []
+    try:
+        if args.replay:
+            events = load_recording(args.replay, args.speed)
+            stage = await replay(bench, events, rng, args.max_in_flight, args.drain)
+            stages.append(dict(stage, source=args.replay))
+            print(json.dumps(stage))
+        else:
+            mix = parse_mix(args.mix)
+            for rate in args.rates:
+                events = synthetic(rate, args.duration, mix, rng)
+                if args.record:
+                    save_recording(f"{args.record}.{rate:g}.jsonl", events)
+                stage = await replay(bench, events, rng, args.max_in_flight, args.drain)
+                stage["target_per_s"] = rate
+                stages.append(stage)
+                print(
+                    f"rate={rate:<7g} done={stage['completed_per_s']:>8}/s "
+                    f"p99={stage['latency'].get('p99_ms')}ms "
+                    f"lock_wait_p99={stage['account_lock_wait'].get('p99_ms')}ms "
+                    f"write_p99={stage['db_write'].get('p99_ms')}ms "
+                    f"errors={stage['errors']} dropped={stage['dropped']}"
+                )
+                if saturated(stage, args.slo_ms) and not args.keep_going:
+                    break
+    finally:
+        await bench.bot.close()
+    sustained = [
+        stage["target_per_s"]
+        for stage in stages
+        if "target_per_s" in stage and not saturated(stage, args.slo_ms)
+    ]
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "guilds": args.guilds,
+            "currencies": args.currencies,
+            "members": args.members,
+            "write_behind": args.write_behind,
+            "pool_size": args.pool_size,
+            "max_overflow": args.max_overflow,
+            "pragmas": config["SQLITE_PRAGMAS"],
+            "slo_ms": args.slo_ms,
+            "seed": args.seed,
+        },
+        "saturation_per_s": max(sustained) if sustained else None,
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded or synthetic interaction traffic at a target rate."
+    )
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--currencies", type=int, default=5)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument(
+        "--rates", type=float, nargs="+", default=[50, 100, 200, 400, 800]
+    )
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per rate.")
+    parser.add_argument("--mix", help="For example dice=45,balance=15,autocomplete=20")
+    parser.add_argument("--replay", help="JSONL file of {at, command} to replay.")
+    parser.add_argument("--speed", type=float, default=1, help="Replay speed-up.")
+    parser.add_argument("--record", help="Save each synthetic stage under this prefix.")
+    parser.add_argument("--slo-ms", type=float, default=250, help="p99 latency budget.")
+    parser.add_argument("--keep-going", action="store_true")
+    parser.add_argument("--max-in-flight", type=int, default=2000)
+    parser.add_argument("--drain", type=float, default=30)
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=5)
+    parser.add_argument("--lock-stripes", type=int, default=1024)
+    parser.add_argument(
+        "--pragma",
+        action="append",
+        default=[],
+        help="Override a SQLite pragma, for example synchronous=FULL.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load.json")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        args.database = os.path.join(directory, "load.db")
+        report = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Saturation point: {report['saturation_per_s']} commands/s")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
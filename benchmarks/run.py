@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import discord
+from sqlalchemy import event
+
+from benchmarks.dataset import build_guilds, currency_names, seed
+from benchmarks.fakes import FakeGuild, FakeInteraction
+from currency_bot import CurrencyBot
+from services.autocomplete import currency_name_autocomplete
+
+EXTENSIONS = ["cogs.dice", "cogs.members-gold", "cogs.leaderboard", "cogs.admin"]
+
+
+class Bench:
+    # Shared state for one run: the bot, its fake guilds and a query counter
+    # fed by the engine's cursor events.
+    def __init__(self, bot: CurrencyBot, guilds: List[FakeGuild], currencies: int):
+        self.bot = bot
+        self.guilds = guilds
+        self.names = currency_names(currencies)
+        self.queries = 0
+        self.created = 0
+        event.listen(bot.engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def cog(self, name: str):
+        return self.bot.get_cog(name)
+
+    def interaction(self, rng: random.Random) -> FakeInteraction:
+        guild = rng.choice(self.guilds)
+        return FakeInteraction(self.bot, guild, rng.choice(guild.members))
+
+    def member(self, interaction: FakeInteraction, rng: random.Random):
+        return rng.choice(interaction.guild.members)
+
+
+async def dice(bench: Bench, rng: random.Random):
+    cog = bench.cog("DiceGame")
+    await cog.dice_game.callback(
+        cog, bench.interaction(rng), rng.choice(bench.names), 100
+    )
+
+
+async def dice_rolls(bench: Bench, rng: random.Random):
+    cog = bench.cog("DiceGame")
+    await cog.dice_game.callback(
+        cog, bench.interaction(rng), rng.choice(bench.names), 100, rolls=25
+    )
+
+
+async def give_gold(bench: Bench, rng: random.Random):
+    cog = bench.cog("MembersGold")
+    interaction = bench.interaction(rng)
+    await cog.give_gold.callback(
+        cog,
+        interaction,
+        bench.member(interaction, rng),
+        rng.choice(bench.names),
+        10,
+    )
+
+
+async def balance(bench: Bench, rng: random.Random):
+    cog = bench.cog("MembersGold")
+    interaction = bench.interaction(rng)
+    await cog.balance.callback(cog, interaction, bench.member(interaction, rng))
+
+
+async def leaderboard(bench: Bench, rng: random.Random):
+    cog = bench.cog("Leaderboard")
+    await cog.leaderboard.callback(cog, bench.interaction(rng), rng.choice(bench.names))
+
+
+async def leaderboard_page(bench: Bench, rng: random.Random):
+    cog = bench.cog("Leaderboard")
+    await cog.leaderboard.callback(
+        cog, bench.interaction(rng), rng.choice(bench.names), page=rng.randrange(2, 10)
+    )
+
+
+async def rank(bench: Bench, rng: random.Random):
+    cog = bench.cog("Leaderboard")
+    interaction = bench.interaction(rng)
+    await cog.rank.callback(
+        cog, interaction, bench.member(interaction, rng), rng.choice(bench.names)
+    )
+
+
+async def print_gold(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    interaction = bench.interaction(rng)
+    await cog.print_currency.callback(
+        cog, interaction, bench.member(interaction, rng), rng.choice(bench.names), 100
+    )
+
+
+async def remove_gold(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    interaction = bench.interaction(rng)
+    await cog.remove_currency.callback(
+        cog, interaction, bench.member(interaction, rng), rng.choice(bench.names), 100
+    )
+
+
+async def bulk_print_gold(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    await cog.bulk_print_currency.callback(
+        cog, bench.interaction(rng), rng.choice(bench.names), 100
+    )
+
+
+async def bulk_remove_gold(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    await cog.bulk_remove_currency.callback(
+        cog, bench.interaction(rng), rng.choice(bench.names), 100
+    )
+
+
+async def set_limits(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    await cog.set_dice_limits.callback(cog, bench.interaction(rng), 1, 1_000_000)
+
+
+async def set_dice(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    await cog.set_dice_win.callback(cog, bench.interaction(rng), 50)
+
+
+async def create_destroy(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    interaction = bench.interaction(rng)
+    bench.created += 1
+    name = f"bench{bench.created}"
+    await cog.create_currency.callback(cog, interaction, name)
+    await cog.delete_currency.callback(cog, interaction, name, "Yes")
+
+
+async def history(bench: Bench, rng: random.Random):
+    cog = bench.cog("Admin")
+    interaction = bench.interaction(rng)
+    await cog.currency_history.callback(
+        cog, interaction, bench.member(interaction, rng), rng.choice(bench.names), 1
+    )
+
+
+async def autocomplete(bench: Bench, rng: random.Random):
+    name = rng.choice(bench.names)
+    start = rng.randrange(len(name))
+    await currency_name_autocomplete(
+        bench.interaction(rng), name[start:start + rng.randrange(1, 4)]
+    )
+
+
+SCENARIOS: Dict[str, Callable[[Bench, random.Random], Awaitable[None]]] = {
+    "dice": dice,
+    "dice_rolls": dice_rolls,
+    "give_gold": give_gold,
+    "balance": balance,
+    "leaderboard": leaderboard,
+    "leaderboard_page": leaderboard_page,
+    "rank": rank,
+    "admin_print_gold": print_gold,
+    "admin_remove_gold": remove_gold,
+    "admin_bulk_print_gold": bulk_print_gold,
+    "admin_bulk_remove_gold": bulk_remove_gold,
+    "admin_set_limits": set_limits,
+    "admin_set_dice": set_dice,
+    "admin_create_destroy": create_destroy,
+    "admin_history": history,
+    "autocomplete": autocomplete,
+}
+
+
+def percentile(quantiles: List[float], pct: int) -> float:
+    return round(quantiles[pct - 1] * 1000, 3)
+
+
+async def measure(bench: Bench, scenario, calls: int, concurrency: int, seed: int):
+    latencies: List[float] = []
+    remaining = [calls]
+
+    async def worker(rng: random.Random):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            await scenario(bench, rng)
+            latencies.append(time.perf_counter() - start)
+
+    queries = bench.queries
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(worker(random.Random(seed + index)) for index in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "calls": calls,
+        "concurrency": concurrency,
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "queries_per_call": round((bench.queries - queries) / calls, 2),
+        "throughput_per_s": round(calls / elapsed, 1),
+    }
+
+
+async def prepare(args, config: dict) -> Bench:
+    bot = CurrencyBot(
+        dict(
+            config,
+            DATABASE=args.database,
+            PREFIX="!",
+            SLOW_QUERY_LOG=os.path.join(os.path.dirname(args.database), "slow.log"),
+        ),
+        intents=discord.Intents.default(),
+    )
+    guilds = build_guilds(args.guilds, args.members)
+    await seed(bot, guilds, args.currencies, random.Random(args.seed))
+    for extension in EXTENSIONS:
+        await bot.load_extension(extension)
+    return Bench(bot, guilds, args.currencies)
+
+
+async def run(args) -> dict:
+    bench = await prepare(
+        args, {"WRITE_BEHIND": args.write_behind, "LEADERBOARD_CACHE_SIZE": 50}
+    )
+    selected = args.commands or list(SCENARIOS)
+    results: Dict[str, List[dict]] = {}
+    try:
+        for name in selected:
+            # One untimed pass warms the caches that are filled lazily.
+            await measure(bench, SCENARIOS[name], args.warmup, 1, args.seed)
+            results[name] = []
+            for concurrency in args.concurrency:
+                result = await measure(
+                    bench, SCENARIOS[name], args.calls, concurrency, args.seed
+                )
+                results[name].append(result)
+                print(
+                    f"{name:<22} c={concurrency:<3} p50={result['p50_ms']:>8}ms "
+                    f"p95={result['p95_ms']:>8}ms p99={result['p99_ms']:>8}ms "
+                    f"q/call={result['queries_per_call']:>6} "
+                    f"{result['throughput_per_s']:>8}/s"
+                )
+    finally:
+        await bench.bot.close()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "guilds": args.guilds,
+            "currencies": args.currencies,
+            "members": args.members,
+            "calls": args.calls,
+            "write_behind": args.write_behind,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the slash command handlers against a local SQLite file."
+    )
+    parser.add_argument("--guilds", type=int, default=2)
+    parser.add_argument("--currencies", type=int, default=5)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--commands", nargs="+", choices=list(SCENARIOS))
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        args.database = os.path.join(directory, "benchmark.db")
+        report = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
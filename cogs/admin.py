@@ -1,82 +1,20 @@
-import json
-import unicodedata
+import os
+import tempfile
 from typing import List, Literal, Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import delete, insert, select, update
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from modals.bank import Bank
-from modals.currency import Currency
-from modals.settings import Settings
-
-with open("config.json") as f:
-    CONFIG = json.load(f)
-
-engine = create_async_engine(f"sqlite+aiosqlite:///{CONFIG['DATABASE']}")
+from services.autocomplete import currency_name_autocomplete
+from services.bank_io import export_balances, import_balances
+from services.currencies import normalize_name
 
 
 class Admin(commands.GroupCog):
     def __init__(self, bot):
         self.bot = bot
 
-    def fix_unicode(self, str):
-        fixed = unicodedata.normalize("NFKD", str).encode("ascii", "ignore").decode()
-        return fixed
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:  # type: ignore
-                if child.name.lower() == cmd.lower():
-                    return child
-        return "No command found."
-
-    async def currency_name_autocomplete(
-        self, interaction: discord.Interaction, current: str
-    ) -> List[app_commands.Choice[str]]:
-        async with engine.begin() as conn:
-            if current != "":
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(
-                        Currency.name.contains(current),
-                        Currency.guild_id == interaction.guild_id,
-                    )
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-            else:
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(Currency.guild_id == interaction.guild_id)
-                    .order_by(Currency.name.asc())
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-        return [app_commands.Choice(name="None", value="None") for _ in range(0, 1)]
-
     @app_commands.command(name="create", description="Creates a new currency.")
     @app_commands.describe(currency_name="The name for your new currency.")
     async def create_currency(
@@ -86,20 +24,13 @@ class Admin(commands.GroupCog):
         currency_embed = discord.Embed()
         if interaction.guild is not None and interaction.guild.icon is not None:
             currency_embed.set_thumbnail(url=interaction.guild.icon.url)
-        currency_name = self.fix_unicode(currency_name)
-        async with engine.begin() as conn:
-            exists = await conn.execute(
-                select(Currency.name)
-                .filter_by(guild_id=interaction.guild_id)
-                .filter(Currency.name.ilike(currency_name))
-            )
-            exists = exists.one_or_none()
-        await engine.dispose(close=True)
+        currency_name = normalize_name(currency_name)
+        exists = self.bot.currencies.get_id(interaction.guild_id, currency_name)
         if exists is not None:
             currency_embed.color = discord.Color.brand_red()
             currency_embed.title = "❌ Currency Create **FAILED**"
             currency_embed.description = (
-                f"You already have a currency called `{exists[0]}`."
+                f"You already have a currency called `{self.bot.currencies.get_name(interaction.guild_id, exists)}`."
             )
             return await interaction.followup.send(
                 embed=currency_embed,
@@ -111,14 +42,7 @@ class Admin(commands.GroupCog):
             currency_embed.description = (
                 f"A new currency `{currency_name}` has been created!"
             )
-            async with engine.begin() as conn:
-                await conn.execute(
-                    insert(Currency).values(
-                        name=currency_name, guild_id=interaction.guild_id
-                    )
-                )
-                await conn.commit()
-            await engine.dispose(close=True)
+            await self.bot.currencies.create(interaction.guild_id, currency_name)  # type: ignore
             return await interaction.followup.send(
                 embed=currency_embed, ephemeral=True
             )
@@ -146,24 +70,20 @@ class Admin(commands.GroupCog):
             return await interaction.followup.send(
                 embed=destroy_embed, ephemeral=True
             )
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            destroy_embed.color = discord.Color.brand_red()
+            destroy_embed.title = "❌ Destroy Currency **FAILED**"
+            destroy_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(
+                embed=destroy_embed, ephemeral=True
+            )
         else:
-            async with engine.begin() as conn:
-                currency_id = await conn.execute(
-                    select(Currency.id).filter_by(
-                        name=currency_name,
-                        guild_id=interaction.guild_id,
-                    )
-                )
-                currency_id = currency_id.first()
-                await conn.execute(
-                    delete(Currency).filter_by(
-                        name=currency_name,
-                        guild_id=interaction.guild_id,
-                    )
-                )
-                await conn.execute(delete(Bank).filter_by(currency_id=currency_id[0]))  # type: ignore
-                await conn.commit()
-            await engine.dispose(close=True)
+            await self.bot.balances.discard_currency(interaction.guild_id, currency_id)
+            await self.bot.currencies.destroy(interaction.guild_id, currency_id)  # type: ignore
+            await self.bot.balances.discard_currency(interaction.guild_id, currency_id)
+            self.bot.leaderboards.forget(interaction.guild_id, currency_id)
+            self.bot.rankings.forget(interaction.guild_id, currency_id)
             destroy_embed.color = discord.Color.brand_green()
             destroy_embed.title = "✅ Destroy Currency **SUCCESSFUL**"
             destroy_embed.description = (
@@ -200,47 +120,21 @@ class Admin(commands.GroupCog):
                 content="Please set `amount` to a value higher than 0.",
                 ephemeral=True
             )
-        async with engine.begin() as conn:
-            currency_id = await conn.execute(
-                select(Currency.id).filter_by(
-                    name=currency_name, guild_id=interaction.guild_id
-                )
-            )
-            currency_id = currency_id.first()
-            user_bank = await conn.execute(
-                select(Bank.amount).filter_by(
-                    currency_id=currency_id[0],  # type: ignore
-                    user_id=member.id,
-                    guild_id=interaction.guild_id,
-                )
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            return await interaction.followup.send(
+                content=f"There is no currency called `{currency_name}`.",
+                ephemeral=True
             )
-            user_bank = user_bank.one_or_none()
-            if user_bank is None:
-                await conn.execute(
-                    insert(Bank).values(
-                        user_id=member.id,
-                        guild_id=interaction.guild_id,
-                        currency_id=currency_id[0],  # type: ignore
-                        amount=amount,
-                    )
-                )
-                await conn.commit()
-            else:
-                new_amt = user_bank[0] + amount
-                await conn.execute(
-                    update(Bank)
-                    .filter_by(
-                        user_id=member.id,
-                        guild_id=interaction.guild_id,
-                        currency_id=currency_id[0],  # type: ignore
-                    )
-                    .values(amount=new_amt)
-                )
-                await conn.commit()
+        await self.bot.balances.credit(
+            interaction.guild_id,
+            currency_id,
+            member.id,
+            amount,
+        )
         await interaction.followup.send(
             content=f"{member.mention}", embed=print_currency_embed
         )
-        await engine.dispose(close=True)
 
     @app_commands.command(
         name="remove_gold", description="Removes currency from a member."
@@ -270,54 +164,294 @@ class Admin(commands.GroupCog):
                 embed=remove_currency_embed,
                 ephemeral=True
             )
-        async with engine.begin() as conn:
-            currency_id = await conn.execute(
-                select(Currency.id).filter_by(
-                    name=currency_name, guild_id=interaction.guild_id
-                )
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            remove_currency_embed.color = discord.Color.brand_red()
+            remove_currency_embed.title = "❌ Remove Currency **FAILED**"
+            remove_currency_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(
+                embed=remove_currency_embed, ephemeral=True
             )
-            currency_id = currency_id.first()
-            current_amount = await conn.execute(
-                select(Bank.amount).filter_by(
-                    user_id=member.id,
-                    guild_id=interaction.guild_id,
-                    currency_id=currency_id[0],  # type: ignore
-                )
+        removed = await self.bot.balances.remove(
+            interaction.guild_id,  # type: ignore
+            currency_id,
+            member.id,
+            amount,
+        )
+        if removed is None:
+            remove_currency_embed.color = discord.Color.brand_red()
+            remove_currency_embed.title = "❌ Remove Currency **FAILED**"
+            remove_currency_embed.description = f"Could not remove `{currency_name}` currency, because {member.mention} has none."
+            return await interaction.followup.send(
+                embed=remove_currency_embed, ephemeral=True
             )
-            current_amount = current_amount.one_or_none()
-            if current_amount is None:
-                remove_currency_embed.color = discord.Color.brand_red()
-                remove_currency_embed.title = "❌ Remove Currency **FAILED**"
-                remove_currency_embed.description = f"Could not remove `{currency_name}` currency, because {member.mention} has none."
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=remove_currency_embed, ephemeral=True
-                )
-            else:
-                set_to_zero = False
-                new_amt = current_amount[0] - amount
-                if new_amt < 0:
-                    new_amt = 0
-                    set_to_zero = True
-                await conn.execute(
-                    update(Bank)
-                    .filter_by(
-                        user_id=member.id,
-                        guild_id=interaction.guild_id,
-                        currency_id=currency_id[0],  # type: ignore
-                    )
-                    .values(amount=new_amt)
-                )
-                await conn.commit()
-                remove_currency_embed.color = discord.Color.brand_green()
-                remove_currency_embed.title = "✅ Remove Currency **SUCCESSFUL**"
-                remove_currency_embed.description = f"{amount:,} `{currency_name}` has been removed from the {member.mention}."
-                if set_to_zero:
-                    remove_currency_embed.description = f"{member.mention} did not have enough `{currency_name}` to remove `{amount:,}`.\n\nThey were set to **0** instead."
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    content=f"{member.mention}", embed=remove_currency_embed
+        remove_currency_embed.color = discord.Color.brand_green()
+        remove_currency_embed.title = "✅ Remove Currency **SUCCESSFUL**"
+        remove_currency_embed.description = f"{amount:,} `{currency_name}` has been removed from the {member.mention}."
+        if removed[1]:
+            remove_currency_embed.description = f"{member.mention} did not have enough `{currency_name}` to remove `{amount:,}`.\n\nThey were set to **0** instead."
+        return await interaction.followup.send(
+            content=f"{member.mention}", embed=remove_currency_embed
+        )
+
+    async def bulk_targets(
+        self, guild: discord.Guild, role: Optional[discord.Role]
+    ) -> List[int]:
+        # Read from the member cache, which needs the members intent and a
+        # chunked guild; bots never hold currency.
+        if not guild.chunked:
+            await guild.chunk()
+        members = guild.members if role is None else role.members
+        return [member.id for member in members if not member.bot]
+
+    @app_commands.command(
+        name="bulk_print_gold",
+        description="Gives currency to every member of a role, or to everyone.",
+    )
+    @app_commands.autocomplete(currency_name=currency_name_autocomplete)
+    @app_commands.describe(currency_name="The name of the currency you want to give.")
+    @app_commands.describe(amount="The amount of currency to give each member.")
+    @app_commands.describe(
+        role="The role whose members get the currency.  Leave blank for everyone."
+    )
+    async def bulk_print_currency(
+        self,
+        interaction: discord.Interaction,
+        currency_name: str,
+        amount: int,
+        role: Optional[discord.Role] = None,
+    ):
+        await interaction.response.defer()
+        bulk_embed = discord.Embed()
+        if interaction.guild is not None and interaction.guild.icon is not None:
+            bulk_embed.set_thumbnail(url=interaction.guild.icon.url)
+        if amount <= 0:
+            return await interaction.followup.send(
+                content="Please set `amount` to a value higher than 0.",
+                ephemeral=True
+            )
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            return await interaction.followup.send(
+                content=f"There is no currency called `{currency_name}`.",
+                ephemeral=True
+            )
+        target = "everyone" if role is None else role.mention
+        user_ids = await self.bulk_targets(interaction.guild, role)  # type: ignore
+        if len(user_ids) == 0:
+            bulk_embed.color = discord.Color.brand_red()
+            bulk_embed.title = "❌ Print Currency **FAILED**"
+            bulk_embed.description = f"There are no members in {target} to give currency to."
+            return await interaction.followup.send(embed=bulk_embed, ephemeral=True)
+        bulk_embed.color = discord.Color.gold()
+        bulk_embed.title = "⏳ Print Currency **IN PROGRESS**"
+        bulk_embed.description = f"Printing `{amount:,}` `{currency_name}` for `{len(user_ids):,}` members of {target}..."
+        message = await interaction.followup.send(embed=bulk_embed, wait=True)
+        credited = await self.bot.balances.credit_many(
+            interaction.guild_id,
+            currency_id,
+            user_ids,
+            amount,
+            self.bot.config.get("BULK_CHUNK_SIZE", 500),
+        )
+        bulk_embed.color = discord.Color.brand_green()
+        bulk_embed.title = "✅ Print Currency **SUCCESSFUL**"
+        bulk_embed.description = f"`{amount:,}` `{currency_name}` has been created in the bags of `{credited:,}` members of {target}!"
+        await message.edit(embed=bulk_embed)
+
+    @app_commands.command(
+        name="bulk_remove_gold",
+        description="Removes currency from every member of a role, or from everyone.",
+    )
+    @app_commands.autocomplete(currency_name=currency_name_autocomplete)
+    @app_commands.describe(currency_name="The name of the currency you want to remove.")
+    @app_commands.describe(amount="The amount of currency to remove from each member.")
+    @app_commands.describe(
+        role="The role whose members lose the currency.  Leave blank for everyone."
+    )
+    async def bulk_remove_currency(
+        self,
+        interaction: discord.Interaction,
+        currency_name: str,
+        amount: int,
+        role: Optional[discord.Role] = None,
+    ):
+        await interaction.response.defer()
+        bulk_embed = discord.Embed()
+        if interaction.guild is not None and interaction.guild.icon is not None:
+            bulk_embed.set_thumbnail(url=interaction.guild.icon.url)
+        if amount <= 0:
+            bulk_embed.color = discord.Color.brand_red()
+            bulk_embed.title = "❌ Remove Currency **FAILED**"
+            bulk_embed.description = "Please set `amount` to a value higher than 0."
+            return await interaction.followup.send(embed=bulk_embed, ephemeral=True)
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            bulk_embed.color = discord.Color.brand_red()
+            bulk_embed.title = "❌ Remove Currency **FAILED**"
+            bulk_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(embed=bulk_embed, ephemeral=True)
+        target = "everyone" if role is None else role.mention
+        user_ids = await self.bulk_targets(interaction.guild, role)  # type: ignore
+        if len(user_ids) == 0:
+            bulk_embed.color = discord.Color.brand_red()
+            bulk_embed.title = "❌ Remove Currency **FAILED**"
+            bulk_embed.description = f"There are no members in {target} to remove currency from."
+            return await interaction.followup.send(embed=bulk_embed, ephemeral=True)
+        bulk_embed.color = discord.Color.gold()
+        bulk_embed.title = "⏳ Remove Currency **IN PROGRESS**"
+        bulk_embed.description = f"Removing `{amount:,}` `{currency_name}` from `{len(user_ids):,}` members of {target}..."
+        message = await interaction.followup.send(embed=bulk_embed, wait=True)
+        removed, clamped = await self.bot.balances.remove_many(
+            interaction.guild_id,
+            currency_id,
+            user_ids,
+            amount,
+            self.bot.config.get("BULK_CHUNK_SIZE", 500),
+        )
+        bulk_embed.color = discord.Color.brand_green()
+        bulk_embed.title = "✅ Remove Currency **SUCCESSFUL**"
+        bulk_embed.description = f"`{amount:,}` `{currency_name}` has been removed from `{removed:,}` members of {target}."
+        bulk_embed.add_field(name="Set to 0", value=f"{clamped:,}")
+        bulk_embed.add_field(name="Had none", value=f"{len(user_ids) - removed:,}")
+        await message.edit(embed=bulk_embed)
+
+    @app_commands.command(
+        name="export", description="Exports every balance in this server to a file."
+    )
+    @app_commands.describe(file_format="CSV for spreadsheets, JSONL for scripts.")
+    async def export_bank(
+        self,
+        interaction: discord.Interaction,
+        file_format: Literal["csv", "jsonl"] = "csv",
+    ):
+        await interaction.response.defer(ephemeral=True)
+        export_embed = discord.Embed()
+        if interaction.guild is not None and interaction.guild.icon is not None:
+            export_embed.set_thumbnail(url=interaction.guild.icon.url)
+        await self.bot.balances.flush()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(
+                directory, f"balances-{interaction.guild_id}.{file_format}"
+            )
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                exported = await export_balances(
+                    self.bot.engine,
+                    interaction.guild_id,  # type: ignore
+                    f,
+                    file_format,
+                    self.bot.config.get("BULK_CHUNK_SIZE", 500),
                 )
+            if os.path.getsize(path) > interaction.guild.filesize_limit:  # type: ignore
+                export_embed.color = discord.Color.brand_red()
+                export_embed.title = "❌ Export **FAILED**"
+                export_embed.description = f"The export of `{exported:,}` balances is too large to upload here.  Run `python -m services.bank_io export` on the host instead."
+                return await interaction.followup.send(embed=export_embed)
+            export_embed.color = discord.Color.brand_green()
+            export_embed.title = "✅ Export **SUCCESSFUL**"
+            export_embed.description = f"Exported `{exported:,}` balances."
+            return await interaction.followup.send(
+                embed=export_embed, file=discord.File(path)
+            )
+
+    @app_commands.command(
+        name="import", description="Imports balances from a CSV or JSONL export."
+    )
+    @app_commands.describe(file="A file made by the export command.")
+    @app_commands.describe(
+        mode="Merge only sets the members in the file; replace also clears everyone else."
+    )
+    async def import_bank(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment,
+        mode: Literal["merge", "replace"] = "merge",
+    ):
+        await interaction.response.defer()
+        import_embed = discord.Embed()
+        if interaction.guild is not None and interaction.guild.icon is not None:
+            import_embed.set_thumbnail(url=interaction.guild.icon.url)
+        file_format = "jsonl" if file.filename.endswith(".jsonl") else "csv"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"import.{file_format}")
+            await file.save(path)  # type: ignore
+            try:
+                # The guild's balance changes wait for the import and then
+                # carry on from the imported rows.
+                async with self.bot.balances.rewrite(interaction.guild_id):
+                    with open(path, newline="", encoding="utf-8") as f:
+                        summary = await import_balances(
+                            self.bot.engine,
+                            self.bot.currencies,
+                            interaction.guild_id,  # type: ignore
+                            f,
+                            file_format,
+                            mode,
+                            self.bot.config.get("BULK_CHUNK_SIZE", 500),
+                        )
+                    for name in self.bot.currencies.names(interaction.guild_id):
+                        currency_id = self.bot.currencies.get_id(interaction.guild_id, name)
+                        self.bot.leaderboards.forget(interaction.guild_id, currency_id)
+                        self.bot.rankings.forget(interaction.guild_id, currency_id)
+            except ValueError as e:
+                import_embed.color = discord.Color.brand_red()
+                import_embed.title = "❌ Import **FAILED**"
+                import_embed.description = f"Nothing was imported, the file has a bad line:\n`{e}`\n\nFix the file and import it again."
+                return await interaction.followup.send(embed=import_embed)
+        import_embed.color = discord.Color.brand_green()
+        import_embed.title = "✅ Import **SUCCESSFUL**"
+        import_embed.description = f"Imported `{summary.accounts:,}` balances from `{file.filename}` ({mode})."
+        import_embed.add_field(name="Changed", value=f"{summary.changed:,}")
+        import_embed.add_field(name="New currencies", value=f"{summary.currencies:,}")
+        return await interaction.followup.send(embed=import_embed)
+
+    @app_commands.command(
+        name="history", description="Shows a member's recent currency history."
+    )
+    @app_commands.autocomplete(currency_name=currency_name_autocomplete)
+    @app_commands.describe(member="The member whose history you want to see.")
+    @app_commands.describe(currency_name="The name of the currency.")
+    @app_commands.describe(
+        hours_ago="Also show the balance the member had this many hours ago."
+    )
+    async def currency_history(
+        self,
+        interaction: discord.Interaction,
+        member: discord.Member,
+        currency_name: str,
+        hours_ago: Optional[app_commands.Range[int, 1]] = None,
+    ):
+        await interaction.response.defer(ephemeral=True)
+        history_embed = discord.Embed(color=discord.Color.random())
+        if interaction.guild is not None and interaction.guild.icon is not None:
+            history_embed.set_thumbnail(url=interaction.guild.icon.url)
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            history_embed.color = discord.Color.brand_red()
+            history_embed.title = "❌ History **FAILED**"
+            history_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(embed=history_embed)
+        history_embed.title = f"`{currency_name}` history for {member.display_name}"
+        entries = await self.bot.ledger.history(
+            interaction.guild_id, currency_id, member.id
+        )
+        lines = []
+        for entry in entries:
+            sign = "+" if entry.to_user_id == member.id else "-"
+            line = f"<t:{entry.ts // 1000}:R> `{sign}{entry.delta:,}` {entry.kind}"
+            if entry.roll is not None:
+                line += f" (rolled `{entry.roll}`)"
+            lines.append(line)
+        history_embed.description = "\n".join(lines) or "No history recorded."
+        if hours_ago is not None:
+            ts = int((discord.utils.utcnow().timestamp() - hours_ago * 3600) * 1000)
+            amount = await self.bot.ledger.balance_at(
+                interaction.guild_id, currency_id, member.id, ts
+            )
+            history_embed.add_field(
+                name=f"Balance {hours_ago} hour(s) ago", value=f"{amount:,}"
+            )
+        return await interaction.followup.send(embed=history_embed)
 
     @app_commands.command(
         name="set_dice", description="Set the win condition for the dice game."
@@ -338,32 +472,14 @@ class Admin(commands.GroupCog):
                 embed=set_dice_embed, ephemeral=True
             )
         else:
-            async with engine.begin() as conn:
-                current_win = await conn.execute(
-                    select(Settings.dice_win).filter_by(guild_id=interaction.guild_id)
-                )
-                current_win = current_win.first()
-                if current_win is None:
-                    # no settings found - insert
-                    await conn.execute(
-                        insert(Settings).values(
-                            guild_id=interaction.guild_id, dice_win=win_amt
-                        )
-                    )
-                    await conn.commit()
-                else:
-                    # settings found - update
-                    await conn.execute(
-                        update(Settings)
-                        .filter_by(guild_id=interaction.guild_id)
-                        .values(dice_win=win_amt)
-                    )
-                    await conn.commit()
-                dice_cmd = await self.find_cmd(self.bot, cmd="dice")
-                set_dice_embed.color = discord.Color.brand_green()
-                set_dice_embed.title = "✅ Set Dice **SUCCESSFUL**"
-                set_dice_embed.description = f"From now, members win only when they get `1-{win_amt}` from {dice_cmd.mention}."  # type: ignore
-                await interaction.followup.send(embed=set_dice_embed)
+            await self.bot.settings.update(interaction.guild_id, dice_win=win_amt)  # type: ignore
+            dice_cmd = self.bot.command_registry.mention(
+                "dice", guild_id=interaction.guild_id
+            )
+            set_dice_embed.color = discord.Color.brand_green()
+            set_dice_embed.title = "✅ Set Dice **SUCCESSFUL**"
+            set_dice_embed.description = f"From now, members win only when they get `1-{win_amt}` from {dice_cmd}."
+            await interaction.followup.send(embed=set_dice_embed)
 
     @app_commands.command(
         name="set_limits",
@@ -399,57 +515,19 @@ class Admin(commands.GroupCog):
                 embed=dice_limit_embed, ephemeral=True
             )
         if min_bet is not None:
-            async with engine.begin() as conn:
-                current_min = await conn.execute(
-                    select(Settings.min_bet).filter_by(guild_id=interaction.guild_id)
-                )
-                current_min = current_min.one_or_none()
-                if current_min is None:
-                    await conn.execute(
-                        insert(Settings).values(
-                            guild_id=interaction.guild_id, min_bet=min_bet
-                        )
-                    )
-                    await conn.commit()
-                else:
-                    await conn.execute(
-                        update(Settings)
-                        .filter_by(guild_id=interaction.guild_id)
-                        .values(min_bet=min_bet)
-                    )
-                    await conn.commit()
-                await engine.dispose(close=True)
-                dice_limit_embed.add_field(
-                    name="",
-                    value=f"Dice minimum bet set to `{min_bet:,}`.",
-                    inline=False,
-                )
+            await self.bot.settings.update(interaction.guild_id, min_bet=min_bet)  # type: ignore
+            dice_limit_embed.add_field(
+                name="",
+                value=f"Dice minimum bet set to `{min_bet:,}`.",
+                inline=False,
+            )
         if max_bet is not None:
-            async with engine.begin() as conn:
-                current_min = await conn.execute(
-                    select(Settings.max_bet).filter_by(guild_id=interaction.guild_id)
-                )
-                current_min = current_min.one_or_none()
-                if current_min is None:
-                    await conn.execute(
-                        insert(Settings).values(
-                            guild_id=interaction.guild_id, max_bet=max_bet
-                        )
-                    )
-                    await conn.commit()
-                else:
-                    await conn.execute(
-                        update(Settings)
-                        .filter_by(guild_id=interaction.guild_id)
-                        .values(max_bet=max_bet)
-                    )
-                    await conn.commit()
-                await engine.dispose(close=True)
-                dice_limit_embed.add_field(
-                    name="",
-                    value=f"Dice maximum bet set to `{max_bet:,}`.",
-                    inline=False,
-                )
+            await self.bot.settings.update(interaction.guild_id, max_bet=max_bet)  # type: ignore
+            dice_limit_embed.add_field(
+                name="",
+                value=f"Dice maximum bet set to `{max_bet:,}`.",
+                inline=False,
+            )
         return await interaction.followup.send(embed=dice_limit_embed)
 
 
@@ -459,5 +537,5 @@ async def setup(bot: commands.Bot):
 
 
 async def teardown(bot: commands.Bot):
-    await bot.remove_cog(Admin(bot))  # type: ignore
+    await bot.remove_cog(Admin.__cog_name__)
     print(f"{__name__[5:].upper()} unloaded")
@@ -1,22 +1,15 @@
-import json
 import random
 import unicodedata
-from typing import List
+from typing import List, Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import delete, insert, select, update
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from modals.bank import Bank
-from modals.currency import Currency
-from modals.settings import Settings
+from services.autocomplete import currency_name_autocomplete
+from services.dice import roll_many
 
-with open("config.json") as f:
-    CONFIG = json.load(f)
-
-engine = create_async_engine(f"sqlite+aiosqlite:///{CONFIG['DATABASE']}")
+MAX_DICE_ROLLS = 100
 
 
 class DiceGame(commands.Cog):
@@ -31,14 +24,8 @@ class DiceGame(commands.Cog):
         self, interaction: discord.Interaction, current: int
     ) -> List[app_commands.Choice[int]]:
         if current == "":
-            async with engine.begin() as conn:
-                min_bet = await conn.execute(
-                    select(Settings.min_bet, Settings.max_bet).filter_by(
-                        guild_id=interaction.guild_id
-                    )
-                )
-                min_bet = min_bet.all()
-            if len(min_bet) == 0:
+            settings = self.bot.settings.get(interaction.guild_id)
+            if settings is None:
                 return [
                     app_commands.Choice(name="No minimum bet set.", value=0)
                     for _ in range(0, 1)
@@ -46,78 +33,38 @@ class DiceGame(commands.Cog):
             else:
                 return [
                     app_commands.Choice(
-                        name=str(f"Minimum bet = {min_bet[0][0]:,}"),
-                        value=min_bet[0][0],
+                        name=str(f"Minimum bet = {settings.min_bet:,}"),
+                        value=settings.min_bet,
                     ),
                     app_commands.Choice(
-                        name=str(f"Maximum bet = {min_bet[0][1]:,}"),
-                        value=min_bet[0][1],
+                        name=str(f"Maximum bet = {settings.max_bet:,}"),
+                        value=settings.max_bet,
                     ),
                 ]
         else:
-            async with engine.begin() as conn:
-                min_bet = await conn.execute(
-                    select(Settings.min_bet, Settings.max_bet).filter_by(
-                        guild_id=interaction.guild_id
-                    )
-                )
-                min_bet = min_bet.all()
-            if len(min_bet) == 0:
+            settings = self.bot.settings.get(interaction.guild_id)
+            if settings is None:
                 return [
                     app_commands.Choice(name="No minimum", value=0) for _ in range(0, 1)
                 ]
             else:
-                if int(current) < min_bet[0][0]:
+                if int(current) < settings.min_bet:
                     return [
                         app_commands.Choice(
-                            name=str(f"Minimum bet = {min_bet[0][0]:,}"),
-                            value=min_bet[0][0],
+                            name=str(f"Minimum bet = {settings.min_bet:,}"),
+                            value=settings.min_bet,
                         ),
                     ]
-                if int(current) > min_bet[0][1]:
+                if int(current) > settings.max_bet:
                     return [
                         app_commands.Choice(
-                            name=str(f"Maximum bet = {min_bet[0][1]:,}"),
-                            value=min_bet[0][1],
+                            name=str(f"Maximum bet = {settings.max_bet:,}"),
+                            value=settings.max_bet,
                         ),
                     ]
                 else:
                     return [app_commands.Choice(name=str(current), value=int(current))]
 
-    async def currency_name_autocomplete(
-        self, interaction: discord.Interaction, current: str
-    ) -> List[app_commands.Choice[str]]:
-        async with engine.begin() as conn:
-            if current != "":
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(
-                        Currency.name.contains(current),
-                        Currency.guild_id == interaction.guild_id,
-                    )
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-            else:
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(Currency.guild_id == interaction.guild_id)
-                    .order_by(Currency.name.asc())
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-        return [app_commands.Choice(name="None", value="None") for _ in range(0, 1)]
-
     @app_commands.command(
         name="dice", description="Bet a currency for a chance to win double back!"
     )
@@ -125,8 +72,19 @@ class DiceGame(commands.Cog):
     @app_commands.describe(currency_name="The currency you want to use to bet.")
     @app_commands.describe(bet_amount="The amount of currency you want to bet.")
     @app_commands.autocomplete(bet_amount=dice_bet_min_autocomplete)  # type: ignore
+    @app_commands.describe(rolls="How many times to roll with this bet.")
+    @app_commands.describe(stop_on_loss="Stop rolling after the first loss.")
+    @app_commands.describe(
+        stop_below="Stop rolling once your balance drops below this amount."
+    )
     async def dice_game(
-        self, interaction: discord.Interaction, currency_name: str, bet_amount: int
+        self,
+        interaction: discord.Interaction,
+        currency_name: str,
+        bet_amount: int,
+        rolls: app_commands.Range[int, 1, MAX_DICE_ROLLS] = 1,
+        stop_on_loss: bool = False,
+        stop_below: Optional[int] = None,
     ):
         await interaction.response.defer()
         dice_game_embed = discord.Embed()
@@ -138,122 +96,138 @@ class DiceGame(commands.Cog):
             dice_game_embed.description = (
                 "Please set `bet_amount` to a value higher than 0."
             )
-            await engine.dispose(close=True)
             return await interaction.followup.send(
                 embed=dice_game_embed, ephemeral=True
             )
-        async with engine.begin() as conn:
-            bet_limits = await conn.execute(
-                select(Settings.min_bet, Settings.max_bet).filter_by(
-                    guild_id=interaction.guild_id
-                )
+        settings = self.bot.settings.get(interaction.guild_id)
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if settings is None or settings.dice_win is None:
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
+            dice_game_embed.description = (
+                "Your server admins have not set the winning roll required yet."
             )
-            bet_limits = bet_limits.one_or_none()
-            if bet_limits is None:
-                dice_game_embed.color = discord.Color.brand_red()
-                dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
-                dice_game_embed.description = (
-                    "Your server admins have not set the winning roll required yet."
-                )
-                await engine.dispose(close=True)
-                return await interaction.followup.send(embed=dice_game_embed)
-            elif bet_amount < bet_limits[0] or bet_amount > bet_limits[1]:
-                dice_game_embed.color = discord.Color.brand_red()
-                dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
-                dice_game_embed.description = f"Your server admins have set a minimum bet of `{bet_limits[0]:,}` and a maximum bet of `{bet_limits[1]:,}`."
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=dice_game_embed, ephemeral=True
-                )
-            currency_id = await conn.execute(
-                select(Currency.id).filter_by(
-                    name=currency_name, guild_id=interaction.guild_id
-                )
+            return await interaction.followup.send(embed=dice_game_embed)
+        elif bet_amount < settings.min_bet or bet_amount > settings.max_bet:
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
+            dice_game_embed.description = f"Your server admins have set a minimum bet of `{settings.min_bet:,}` and a maximum bet of `{settings.max_bet:,}`."
+            return await interaction.followup.send(
+                embed=dice_game_embed, ephemeral=True
             )
-            currency_id = currency_id.first()
-            currency_amt = await conn.execute(
-                select(Bank.amount).filter_by(
-                    user_id=interaction.user.id,
-                    guild_id=interaction.guild_id,
-                    currency_id=currency_id[0],  # type: ignore
-                )
+        elif currency_id is None:
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
+            dice_game_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(
+                embed=dice_game_embed, ephemeral=True
             )
-            currency_amt = currency_amt.one_or_none()
+        if rolls > 1 or stop_below is not None:
+            return await self.dice_series(
+                interaction,
+                dice_game_embed,
+                currency_name,
+                currency_id,
+                bet_amount,
+                rolls,
+                stop_on_loss,
+                stop_below,
+            )
+        dice_role = random.randrange(0, 101)
+        won = dice_role <= settings.dice_win
+        new_amt = await self.bot.balances.wager(
+            interaction.guild_id,
+            currency_id,
+            interaction.user.id,
+            bet_amount,
+            won,
+            roll=dice_role,
+        )
+        if new_amt is None:
+            # Only the failure path needs to know why the bet was refused.
+            currency_amt = await self.bot.balances.get(
+                interaction.guild_id, currency_id, interaction.user.id
+            )
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
             if currency_amt is None:
-                dice_game_embed.color = discord.Color.brand_red()
-                dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
                 dice_game_embed.description = (
                     f"You do not have any of `{currency_name}` currency to bet."
                 )
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=dice_game_embed, ephemeral=True
-                )
-            elif currency_amt[0] < bet_amount:
-                dice_game_embed.color = discord.Color.brand_red()
-                dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
+            else:
                 dice_game_embed.description = f"You do not have enough of `{currency_name}` currency to bet `{bet_amount}`."
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=dice_game_embed, ephemeral=True
+            return await interaction.followup.send(
+                embed=dice_game_embed, ephemeral=True
+            )
+        if won:
+            dice_game_embed.color = discord.Color.brand_green()
+            dice_game_embed.title = "🎲 Dice Game 🎲 **WON**"
+            dice_game_embed.description = f"You wagered `{bet_amount:,}` of `{currency_name}` and your roll was `{dice_role}`, which is a winning number.\n\nYou gained `{bet_amount:,}` of `{currency_name}`!\nNow you have `{new_amt:,}` of `{currency_name}`."
+        else:
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "🎲 Dice Game 🎲 **LOST**"
+            dice_game_embed.description = f"You wagered `{bet_amount:,}` of `{currency_name}` and your roll was `{dice_role}`, which is a losing number.\nTry again!\n\nYou lost `{bet_amount:,}` of `{currency_name}`.\nNow you have `{new_amt:,}` of `{currency_name}`."
+        dice_game_embed.set_footer(
+            text=f"Winning numbers are less than or equal to {settings.dice_win}."
+        )
+        return await interaction.followup.send(embed=dice_game_embed)
+
+    async def dice_series(
+        self,
+        interaction: discord.Interaction,
+        dice_game_embed: discord.Embed,
+        currency_name: str,
+        currency_id: int,
+        bet_amount: int,
+        rolls: int,
+        stop_on_loss: bool,
+        stop_below: Optional[int],
+    ):
+        settings = self.bot.settings.get(interaction.guild_id)
+        run = await self.bot.balances.wager_rolls(
+            interaction.guild_id,
+            currency_id,
+            interaction.user.id,
+            bet_amount,
+            roll_many(rolls),
+            settings.dice_win,
+            stop_on_loss,
+            stop_below,
+        )
+        if run is None or len(run.rolls) == 0:
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
+            if run is None:
+                dice_game_embed.description = (
+                    f"You do not have any of `{currency_name}` currency to bet."
                 )
+            elif run.balance < bet_amount:
+                dice_game_embed.description = f"You do not have enough of `{currency_name}` currency to bet `{bet_amount}`."
             else:
-                winning_number = await conn.execute(
-                    select(Settings.dice_win).filter_by(guild_id=interaction.guild_id)
-                )
-                winning_number = winning_number.one_or_none()
-                if winning_number is None:
-                    dice_game_embed.color = discord.Color.brand_red()
-                    dice_game_embed.title = "❌ Dice Game ❌ **FAILED**"
-                    dice_game_embed.description = (
-                        "Your server admins have not set the winning roll required yet."
-                    )
-                    await engine.dispose(close=True)
-                    return await interaction.followup.send(embed=dice_game_embed)
-                else:
-                    dice_role = random.randrange(0, 101)
-                    if dice_role <= winning_number[0]:
-                        amt_to_add = bet_amount
-                        new_amt = currency_amt[0] + amt_to_add
-                        dice_game_embed.color = discord.Color.brand_green()
-                        dice_game_embed.title = "🎲 Dice Game 🎲 **WON**"
-                        dice_game_embed.description = f"You wagered `{bet_amount:,}` of `{currency_name}` and your roll was `{dice_role}`, which is a winning number.\n\nYou gained `{amt_to_add:,}` of `{currency_name}`!\nNow you have `{new_amt:,}` of `{currency_name}`."
-                        dice_game_embed.set_footer(
-                            text=f"Winning numbers are less than or equal to {winning_number[0]}."
-                        )
-                        await conn.execute(
-                            update(Bank)
-                            .filter_by(
-                                user_id=interaction.user.id,
-                                guild_id=interaction.guild_id,
-                                currency_id=currency_id[0],  # type: ignore
-                            )
-                            .values(amount=new_amt)
-                        )
-                        await conn.commit()
-                        await engine.dispose(close=True)
-                        return await interaction.followup.send(embed=dice_game_embed)
-                    else:
-                        amt_to_remove = bet_amount
-                        new_amt = currency_amt[0] - amt_to_remove
-                        dice_game_embed.color = discord.Color.brand_red()
-                        dice_game_embed.title = "🎲 Dice Game 🎲 **LOST**"
-                        dice_game_embed.description = f"You wagered `{bet_amount:,}` of `{currency_name}` and your roll was `{dice_role}`, which is a losing number.\nTry again!\n\nYou lost `{bet_amount:,}` of `{currency_name}`.\nNow you have `{new_amt:,}` of `{currency_name}`."
-                        dice_game_embed.set_footer(
-                            text=f"Winning numbers are less than or equal to {winning_number[0]}."
-                        )
-                        await conn.execute(
-                            update(Bank)
-                            .filter_by(
-                                user_id=interaction.user.id,
-                                guild_id=interaction.guild_id,
-                                currency_id=currency_id[0],  # type: ignore
-                            )
-                            .values(amount=new_amt)
-                        )
-                        await conn.commit()
-                        await engine.dispose(close=True)
-                        return await interaction.followup.send(embed=dice_game_embed)
+                dice_game_embed.description = f"You already have less than `{stop_below:,}` of `{currency_name}`."
+            return await interaction.followup.send(
+                embed=dice_game_embed, ephemeral=True
+            )
+        if run.net > 0:
+            dice_game_embed.color = discord.Color.brand_green()
+            dice_game_embed.title = "🎲 Dice Game 🎲 **WON**"
+        elif run.net < 0:
+            dice_game_embed.color = discord.Color.brand_red()
+            dice_game_embed.title = "🎲 Dice Game 🎲 **LOST**"
+        else:
+            dice_game_embed.color = discord.Color.gold()
+            dice_game_embed.title = "🎲 Dice Game 🎲 **EVEN**"
+        rolled = ", ".join(str(roll) for roll in run.rolls)
+        dice_game_embed.description = f"You rolled `{len(run.rolls)}` of `{rolls}` times, wagering `{bet_amount:,}` of `{currency_name}` each time.\n\nYour rolls: `{rolled}`"
+        dice_game_embed.add_field(name="Wins", value=f"{run.wins:,}")
+        dice_game_embed.add_field(name="Losses", value=f"{run.losses:,}")
+        dice_game_embed.add_field(name="Longest streak", value=f"{run.longest_streak:,}")
+        dice_game_embed.add_field(name="Net", value=f"{run.net:+,}")
+        dice_game_embed.add_field(name="Now you have", value=f"{run.balance:,}")
+        dice_game_embed.set_footer(
+            text=f"Winning numbers are less than or equal to {settings.dice_win}."
+        )
+        return await interaction.followup.send(embed=dice_game_embed)
 
     @app_commands.command(
         name="roll", description="Roll a random number from 1 to 100."
@@ -271,5 +245,5 @@ async def setup(bot: commands.Bot):
 
 
 async def teardown(bot: commands.Bot):
-    await bot.remove_cog(DiceGame(bot))  # type: ignore
+    await bot.remove_cog(DiceGame.__cog_name__)
     print(f"{__name__[5:].upper()} unloaded")
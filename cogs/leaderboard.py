@@ -1,20 +1,11 @@
-import json
 import unicodedata
-from typing import List
+from typing import Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import delete, insert, select, update
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from modals.bank import Bank
-from modals.currency import Currency
-
-with open("config.json") as f:
-    CONFIG = json.load(f)
-
-engine = create_async_engine(f"sqlite+aiosqlite:///{CONFIG['DATABASE']}")
+from services.autocomplete import currency_name_autocomplete
 
 
 class Leaderboard(commands.Cog):
@@ -25,46 +16,18 @@ class Leaderboard(commands.Cog):
         fixed = unicodedata.normalize("NFKD", str).encode("ascii", "ignore").decode()
         return fixed
 
-    async def currency_name_autocomplete(
-        self, interaction: discord.Interaction, current: str
-    ) -> List[app_commands.Choice[str]]:
-        async with engine.begin() as conn:
-            if current != "":
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(
-                        Currency.name.contains(current),
-                        Currency.guild_id == interaction.guild_id,
-                    )
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-            else:
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(Currency.guild_id == interaction.guild_id)
-                    .order_by(Currency.name.asc())
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-        return [app_commands.Choice(name="None", value="None") for _ in range(0, 1)]
-
     @app_commands.command(
         name="leaderboard",
-        description="Shows the top 25 holders of the specified currency.",
+        description="Shows the holders of the specified currency, 25 per page.",
     )
     @app_commands.autocomplete(currency_name=currency_name_autocomplete)
-    async def leaderboard(self, interaction: discord.Interaction, currency_name: str):
+    @app_commands.describe(page="The page to show.  Page 1 is the top 25.")
+    async def leaderboard(
+        self,
+        interaction: discord.Interaction,
+        currency_name: str,
+        page: app_commands.Range[int, 1] = 1,
+    ):
         await interaction.response.defer()
         leaderboard_embed = discord.Embed(
             color=discord.Color.random(),
@@ -72,23 +35,24 @@ class Leaderboard(commands.Cog):
         if interaction.guild is not None and interaction.guild.icon is not None:
             leaderboard_embed.set_thumbnail(url=interaction.guild.icon.url)
         leaderboard_embed.title = f"🥉 🥈 🥇 Leaderboard for {currency_name} 🥇 🥈 🥉"
-        async with engine.begin() as conn:
-            currency_id = await conn.execute(
-                select(Currency.id).filter_by(
-                    name=currency_name, guild_id=interaction.guild_id
-                )
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            leaderboard_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(embed=leaderboard_embed)
+        if page == 1:
+            top_25_list = await self.bot.leaderboards.top(
+                interaction.guild_id, currency_id, 25
             )
-            currency_id = currency_id.first()
-            top_25_list = await conn.execute(
-                select(Bank.user_id, Bank.amount)
-                .filter_by(guild_id=interaction.guild_id, currency_id=currency_id[0])  # type: ignore
-                .order_by(Bank.amount.desc())
-                .limit(25)
+            footer = f"Top {len(top_25_list)} members."
+        else:
+            top_25_list, total = await self.bot.rankings.page(
+                interaction.guild_id, currency_id, (page - 1) * 25, 25
             )
-            top_25_list = top_25_list.all()
-        await engine.dispose(close=True)
+            footer = f"Ranks {(page - 1) * 25 + 1:,}-{(page - 1) * 25 + len(top_25_list):,} of {total:,} members.  Page {page} of {-(-total // 25)}."
         if len(top_25_list) == 0:
             leaderboard_embed.description = "No one has that currency yet."
+            if page > 1:
+                leaderboard_embed.description = f"There is no page {page} for that currency."
             return await interaction.followup.send(embed=leaderboard_embed)
         else:
             if interaction.guild is not None:
@@ -107,10 +71,65 @@ class Leaderboard(commands.Cog):
                             value=f"{currency_amount:,}",
                             inline=False,
                         )
-                leaderboard_embed.set_footer(text=f"Top {len(top_25_list)} members.")
+                leaderboard_embed.set_footer(text=footer)
                 return await interaction.followup.send(embed=leaderboard_embed)
 
-        pass
+    @app_commands.command(
+        name="rank",
+        description="Shows where a member ranks on the leaderboard of a currency.",
+    )
+    @app_commands.autocomplete(currency_name=currency_name_autocomplete)
+    @app_commands.describe(
+        member="The member to rank.  Leave blank to rank yourself."
+    )
+    @app_commands.describe(
+        currency_name="The currency to rank in.  Leave blank to rank in every currency held."
+    )
+    async def rank(
+        self,
+        interaction: discord.Interaction,
+        member: Optional[discord.Member] = None,
+        currency_name: Optional[str] = None,
+    ):
+        await interaction.response.defer()
+        rank_embed = discord.Embed(color=discord.Color.random())
+        if interaction.guild is not None and interaction.guild.icon is not None:
+            rank_embed.set_thumbnail(url=interaction.guild.icon.url)
+        if member is None:
+            member = interaction.user  # type: ignore
+        rank_embed.title = f"🏅 Ranks for {member.display_name} 🏅"  # type: ignore
+        if currency_name is not None:
+            currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+            if currency_id is None:
+                rank_embed.color = discord.Color.brand_red()
+                rank_embed.title = "❌ Rank **FAILED**"
+                rank_embed.description = f"There is no currency called `{currency_name}`."
+                return await interaction.followup.send(embed=rank_embed, ephemeral=True)
+            currency_ids = [currency_id]
+        else:
+            rows = await self.bot.balances.member_balances(
+                interaction.guild_id, member.id, 25  # type: ignore
+            )
+            currency_ids = [row[0] for row in rows]
+        for currency_id in currency_ids:
+            position, amount, total = await self.bot.rankings.rank(
+                interaction.guild_id, currency_id, member.id  # type: ignore
+            )
+            if position == 0:
+                continue
+            rank_embed.add_field(
+                name=self.bot.currencies.get_name(interaction.guild_id, currency_id),
+                value=f"#{position:,} of {total:,} with `{amount:,}`",
+                inline=False,
+            )
+        if len(rank_embed.fields) == 0:
+            rank_embed.color = discord.Color.brand_red()
+            rank_embed.title = "❌ Rank **FAILED**"
+            rank_embed.description = f"{member.mention} has none of that currency!"  # type: ignore
+            if currency_name is None:
+                rank_embed.description = f"{member.mention} has no currencies!"  # type: ignore
+            return await interaction.followup.send(embed=rank_embed, ephemeral=True)
+        return await interaction.followup.send(embed=rank_embed)
 
 
 async def setup(bot: commands.Bot):
@@ -119,5 +138,5 @@ async def setup(bot: commands.Bot):
 
 
 async def teardown(bot: commands.Bot):
-    await bot.remove_cog(Leaderboard(bot))  # type: ignore
+    await bot.remove_cog(Leaderboard.__cog_name__)
     print(f"{__name__[5:].upper()} unloaded")
@@ -1,64 +1,32 @@
-import json
 import unicodedata
-from typing import List, Optional
+import weakref
+from typing import List, Optional, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import delete, insert, select, update
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from modals.bank import Bank
-from modals.currency import Currency
+from services.autocomplete import currency_name_autocomplete
 
-with open("config.json") as f:
-    CONFIG = json.load(f)
-
-engine = create_async_engine(f"sqlite+aiosqlite:///{CONFIG['DATABASE']}")
+BALANCE_PAGE_SIZE = 25
 
 
 class MembersGold(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Open /balance pagers outlive a reload and are handed to the new cog.
+        state = bot.cog_state.pop(self.qualified_name, {})
+        self.pages: weakref.WeakSet = state.get("pages", weakref.WeakSet())
+        for view in self.pages:
+            view.cog = self
+
+    async def cog_unload(self):
+        self.bot.cog_state[self.qualified_name] = {"pages": self.pages}
 
     def fix_unicode(self, str):
         fixed = unicodedata.normalize("NFKD", str).encode("ascii", "ignore").decode()
         return fixed
 
-    async def currency_name_autocomplete(
-        self, interaction: discord.Interaction, current: str
-    ) -> List[app_commands.Choice[str]]:
-        async with engine.begin() as conn:
-            if current != "":
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(
-                        Currency.name.contains(current),
-                        Currency.guild_id == interaction.guild_id,
-                    )
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-            else:
-                results = await conn.execute(
-                    select(Currency.name)
-                    .where(Currency.guild_id == interaction.guild_id)
-                    .order_by(Currency.name.asc())
-                    .limit(25)
-                )
-                results = results.all()
-                if results is not None:
-                    return [
-                        app_commands.Choice(name=solution[0], value=solution[0])
-                        for solution in results
-                    ]
-        return [app_commands.Choice(name="None", value="None") for _ in range(0, 1)]
-
     @app_commands.command(name="give_gold", description="Give gold to another member.")
     @app_commands.autocomplete(currency_name=currency_name_autocomplete)
     @app_commands.describe(member="The member you want to give gold to.")
@@ -93,105 +61,64 @@ class MembersGold(commands.Cog):
                 embed=give_gold_embed,
                 ephemeral=True
             )
-        async with engine.begin() as conn:
-            currency_id = await conn.execute(
-                select(Currency.id).filter_by(
-                    name=currency_name, guild_id=interaction.guild_id
-                )
+        currency_id = self.bot.currencies.get_id(interaction.guild_id, currency_name)
+        if currency_id is None:
+            give_gold_embed.color = discord.Color.brand_red()
+            give_gold_embed.title = "❌ Give Gold **FAILED**"
+            give_gold_embed.description = f"There is no currency called `{currency_name}`."
+            return await interaction.followup.send(
+                embed=give_gold_embed,
+                ephemeral=True
             )
-            currency_id = currency_id.first()
-            from_amount = await conn.execute(
-                select(Bank.amount).filter_by(
-                    user_id=interaction.user.id,
-                    guild_id=interaction.guild_id,
-                    currency_id=currency_id[0],  # type: ignore
-                )
+        from_amount = await self.bot.balances.transfer(
+            interaction.guild_id,
+            currency_id,
+            interaction.user.id,
+            member.id,
+            amount,
+        )
+        if from_amount is None:
+            from_amount = await self.bot.balances.get(
+                interaction.guild_id, currency_id, interaction.user.id
             )
-            from_amount = from_amount.one_or_none()
+            give_gold_embed.color = discord.Color.brand_red()
+            give_gold_embed.title = "❌ Give Gold **FAILED**"
             if from_amount is None:
-                give_gold_embed.color = discord.Color.brand_red()
-                give_gold_embed.title = "❌ Give Gold **FAILED**"
                 give_gold_embed.description = (
                     f"You cannot send `{currency_name}`, because you have none."
                 )
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=give_gold_embed,
-                    ephemeral=True
-                )
-            elif from_amount[0] < amount:
-                give_gold_embed.color = discord.Color.brand_red()
-                give_gold_embed.title = "❌ Give Gold **FAILED**"
-                give_gold_embed.description = f"You cannot `{amount:,}` of `{currency_name}`, beacuse you only have `{from_amount[0]:,}`."
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=give_gold_embed,
-                    ephemeral=True
-                )
             else:
-                to_amount = await conn.execute(
-                    select(Bank.amount).filter_by(
-                        user_id=member.id,
-                        guild_id=interaction.guild_id,
-                        currency_id=currency_id[0],  # type: ignore
-                    )
-                )
-                to_amount = to_amount.one_or_none()
-                if to_amount is None:
-                    new_from_amt = from_amount[0] - amount
-                    await conn.execute(
-                        update(Bank)
-                        .filter_by(
-                            user_id=interaction.user.id,
-                            guild_id=interaction.guild_id,
-                            currency_id=currency_id[0],  # type: ignore
-                        )
-                        .values(amount=new_from_amt)
-                    )
-                    await conn.execute(
-                        insert(Bank).values(
-                            user_id=member.id,
-                            guild_id=interaction.guild_id,
-                            currency_id=currency_id[0],  # type: ignore
-                            amount=amount,
-                        )
-                    )
-                    await conn.commit()
-                    await engine.dispose(close=True)
-                else:
-                    new_amt = to_amount[0] + amount
-                    new_from_amt = from_amount[0] - amount
-                    await conn.execute(
-                        update(Bank)
-                        .filter_by(
-                            user_id=interaction.user.id,
-                            guild_id=interaction.guild_id,
-                            currency_id=currency_id[0],  # type: ignore
-                        )
-                        .values(amount=new_from_amt)
-                    )
-                    await conn.execute(
-                        update(Bank)
-                        .filter_by(
-                            user_id=member.id,
-                            guild_id=interaction.guild_id,
-                            currency_id=currency_id[0],  # type: ignore
-                        )
-                        .values(amount=new_amt)
-                    )
-                    await conn.commit()
-                    await engine.dispose(close=True)
-                give_gold_embed.color = discord.Color.green()
-                give_gold_embed.title = "✅ Give Gold **SUCCESSFUL**"
-                give_gold_embed.description = f"{interaction.user.mention} gave `{amount}` of `{currency_name}` to {member.mention}!"
-                return await interaction.followup.send(
-                    content=f"{interaction.user.mention} -> {member.mention}",
-                    embed=give_gold_embed
-                )
+                give_gold_embed.description = f"You cannot `{amount:,}` of `{currency_name}`, beacuse you only have `{from_amount:,}`."
+            return await interaction.followup.send(
+                embed=give_gold_embed,
+                ephemeral=True
+            )
+        give_gold_embed.color = discord.Color.green()
+        give_gold_embed.title = "✅ Give Gold **SUCCESSFUL**"
+        give_gold_embed.description = f"{interaction.user.mention} gave `{amount}` of `{currency_name}` to {member.mention}!"
+        return await interaction.followup.send(
+            content=f"{interaction.user.mention} -> {member.mention}",
+            embed=give_gold_embed
+        )
+
+    async def balance_page(
+        self,
+        guild_id: int,
+        user_id: int,
+        after: Optional[Tuple[int, int]] = None,
+    ):
+        rows = await self.bot.balances.member_balances(
+            guild_id, user_id, BALANCE_PAGE_SIZE + 1, after
+        )
+        rows = [
+            (self.bot.currencies.get_name(guild_id, currency_id), amount, currency_id)
+            for currency_id, amount in rows
+        ]
+        return rows[:BALANCE_PAGE_SIZE], len(rows) > BALANCE_PAGE_SIZE
 
     @app_commands.command(
         name="balance",
-        description="Shows how much of each currency the member has. (Highest 25 only)",
+        description="Shows how much of each currency the member has.",
     )
     @app_commands.describe(
         member="The member to check the balance of.  Leave blank to check yours."
@@ -205,36 +132,88 @@ class MembersGold(commands.Cog):
             balance_embed.set_thumbnail(url=interaction.guild.icon.url)
         if member is None:
             member = interaction.user  # type: ignore
-        async with engine.begin() as conn:
-            currencies_amounts = await conn.execute(
-                select(Bank.amount, Bank.currency_id)
-                .filter_by(
-                    guild_id=interaction.guild_id, user_id=member.id  # type: ignore
-                )
-                .order_by(Bank.amount.desc())
-                .limit(25)
+        currencies_amounts, has_more = await self.balance_page(
+            interaction.guild_id, member.id  # type: ignore
+        )
+        if len(currencies_amounts) == 0:
+            balance_embed.color = discord.Color.brand_red()
+            balance_embed.title = "❌ Balance **FAILED**"
+            balance_embed.description = f"{member.mention} has no currencies!"  # type: ignore
+            return await interaction.followup.send(
+                embed=balance_embed, ephemeral=True
             )
-            currencies_amounts = currencies_amounts.all()
-            if len(currencies_amounts) == 0:
-                balance_embed.color = discord.Color.brand_red()
-                balance_embed.title = "❌ Balance **FAILED**"
-                balance_embed.description = f"{member.mention} has no currencies!"  # type: ignore
-                await engine.dispose(close=True)
-                return await interaction.followup.send(
-                    embed=balance_embed, ephemeral=True
-                )
-            else:
-                balance_embed.title = f"Balances for {member.display_name}"  # type: ignore
-                for cur in currencies_amounts:
-                    currency_name = await conn.execute(
-                        select(Currency.name).filter_by(id=cur[1])
-                    )
-                    currency_name = currency_name.first()
-                    balance_embed.add_field(
-                        name=currency_name[0], value=f"{cur[0]:,}", inline=False  # type: ignore
-                    )
-                await engine.dispose(close=True)
-                return await interaction.followup.send(embed=balance_embed)
+        balance_embed.title = f"Balances for {member.display_name}"  # type: ignore
+        view = BalancePages(self, interaction, member, balance_embed)  # type: ignore
+        view.show(currencies_amounts, has_more)
+        if not has_more:
+            return await interaction.followup.send(embed=balance_embed)
+        self.pages.add(view)
+        view.message = await interaction.followup.send(
+            embed=balance_embed, view=view, wait=True
+        )
+
+
+class BalancePages(discord.ui.View):
+    def __init__(
+        self,
+        cog: MembersGold,
+        interaction: discord.Interaction,
+        member: discord.Member,
+        embed: discord.Embed,
+    ):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.guild_id = interaction.guild_id
+        self.owner_id = interaction.user.id
+        self.member = member
+        self.embed = embed
+        self.message: Optional[discord.WebhookMessage] = None
+        # cursors[n] is the last (amount, currency_id) shown before page n.
+        self.cursors: List[Optional[Tuple[int, int]]] = [None]
+
+    def show(self, rows, has_more: bool):
+        self.embed.clear_fields()
+        for cur in rows:
+            self.embed.add_field(name=cur[0], value=f"{cur[1]:,}", inline=False)
+        self.embed.set_footer(text=f"Page {len(self.cursors)}")
+        if len(rows) > 0:
+            self.last = (rows[-1][1], rows[-1][2])
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = not has_more
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.owner_id
+
+    async def turn(self, interaction: discord.Interaction):
+        rows, has_more = await self.cog.balance_page(
+            self.guild_id, self.member.id, self.cursors[-1]  # type: ignore
+        )
+        if len(rows) == 0 and len(self.cursors) > 1:
+            # The member spent their way off this page since it was shown.
+            self.cursors.pop()
+            rows, has_more = await self.cog.balance_page(
+                self.guild_id, self.member.id, self.cursors[-1]  # type: ignore
+            )
+        self.show(rows, has_more)
+        await interaction.response.edit_message(embed=self.embed, view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        self.cursors.pop()
+        await self.turn(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        self.cursors.append(self.last)
+        await self.turn(interaction)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            await self.message.edit(view=None)
 
 
 async def setup(bot: commands.Bot):
@@ -243,5 +222,5 @@ async def setup(bot: commands.Bot):
 
 
 async def teardown(bot: commands.Bot):
-    await bot.remove_cog(MembersGold(bot))  # type: ignore
+    await bot.remove_cog(MembersGold.__cog_name__)
     print(f"{__name__[5:].upper()} unloaded")
@@ -0,0 +1,69 @@
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+
+async def is_owner(interaction: discord.Interaction) -> bool:
+    return await interaction.client.is_owner(interaction.user)  # type: ignore
+
+
+def ms(seconds: float) -> str:
+    if seconds == float("inf"):
+        return ">10s"
+    return f"{seconds * 1000:g}ms"
+
+
+class Stats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(
+        name="stats", description="Shows command latency and database statistics."
+    )
+    @app_commands.check(is_owner)
+    async def stats(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        metrics = self.bot.metrics
+        uptime = int(time.time() - metrics.started)
+        stats_embed = discord.Embed(
+            title="📊 Bot Stats",
+            color=discord.Color.blurple(),
+            description=f"Up for `{uptime // 3600}h {uptime % 3600 // 60}m`.  Latencies are bucket upper bounds.",
+        )
+        for row in metrics.summary()[:20]:
+            stats_embed.add_field(
+                name=f"/{row['command']}",
+                value=(
+                    f"`{row['calls']:,}` calls, `{row['errors']:,}` errors\n"
+                    f"p50 `{ms(row['p50'])}` p95 `{ms(row['p95'])}` p99 `{ms(row['p99'])}`\n"
+                    f"DB p95 `{ms(row['db_p95'])}`, `{row['queries']:.1f}` queries, `{row['rows_written']:.1f}` rows written"
+                ),
+            )
+        misses = sum(metrics.deadline_misses.values())
+        lookups = sum(h.count for h in metrics.autocomplete.values())
+        stats_embed.add_field(
+            name="Database",
+            value=(
+                f"`{metrics.total_queries:,}` queries\n"
+                f"Pool wait p95 `{ms(metrics.pool_wait.quantile(0.95))}`"
+            ),
+            inline=False,
+        )
+        stats_embed.add_field(
+            name="Autocomplete",
+            value=f"`{lookups:,}` lookups, `{misses:,}` over the deadline",
+            inline=False,
+        )
+        await interaction.followup.send(embed=stats_embed)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Stats(bot))
+    print(f"{__name__[5:].upper()} loaded")
+
+
+async def teardown(bot: commands.Bot):
+    await bot.remove_cog(Stats.__cog_name__)
+    print(f"{__name__[5:].upper()} unloaded")
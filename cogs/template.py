@@ -1,19 +1,12 @@
-import json
 import unicodedata
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 from sqlalchemy import delete, insert, select, update
-from sqlalchemy.ext.asyncio import create_async_engine
 
 from modals.currency import Currency
 
-with open("config.json") as f:
-    CONFIG = json.load(f)
-
-engine = create_async_engine(f"sqlite+aiosqlite:///{CONFIG['DATABASE']}")
-
 
 class Template(commands.GroupCog):
     def __init__(self, bot):
@@ -30,5 +23,5 @@ async def setup(bot: commands.Bot):
 
 
 async def teardown(bot: commands.Bot):
-    await bot.remove_cog(Template(bot))  # type: ignore
+    await bot.remove_cog(Template.__cog_name__)
     print(f"{__name__[5:].upper()} unloaded")
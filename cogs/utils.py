@@ -1,7 +1,6 @@
 import unicodedata
 
 import discord
-import docker
 from discord import app_commands
 from discord.ext import commands
 
@@ -25,6 +24,7 @@ class Utils(commands.GroupCog):
     # @app_commands.check(check_perms)
     # async def restart_bot(self, interaction: discord.Interaction):
     #     await interaction.response.defer(ephemeral=True)
+    #     import docker  # imported here so startup never pays for it
     #     docker_client = docker.DockerClient(base_url="unix://var/run/docker.sock")
     #     container = docker_client.containers.get("bot.CurrencyAndDiceBot")
     #     await interaction.followup.send(
@@ -49,5 +49,5 @@ async def setup(bot: commands.Bot):
 
 
 async def teardown(bot: commands.Bot):
-    await bot.remove_cog(Utils(bot))  # type: ignore
+    await bot.remove_cog(Utils.__cog_name__)
     print(f"{__name__[5:].upper()} unloaded")
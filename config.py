@@ -0,0 +1,9 @@
+import json
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str = "config.json") -> dict:
+    # Parsed once per process; everything else reads `bot.config`.
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+from discord.ext import commands
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import create_engine, log_pragmas
+from migrations import run_migrations
+from modals.bank import Bank
+from modals.currency import Currency
+from modals.settings import Settings
+from modals.snapshot import BalanceSnapshot
+from modals.transaction import Transaction
+from services.balances import Balances
+from services.command_registry import CommandRegistry
+from services.currencies import CurrencyRegistry
+from services.leaderboard import LeaderboardCache
+from services.ledger import Ledger
+from services.metrics import MeteredCommandTree, Metrics, start_server
+from services.ranking import RankingCache
+from services.settings import SettingsCache
+from services.slow_queries import SlowQueryLog
+from services.write_behind import WriteBehindBalances
+
+
+class CurrencyBot(commands.Bot):
+    def __init__(self, config: dict, **kwargs):
+        metrics = Metrics(config.get("AUTOCOMPLETE_DEADLINE_MS", 2500))
+        super().__init__(
+            command_prefix=config["PREFIX"],
+            tree_cls=MeteredCommandTree,
+            http_trace=metrics.http_trace(),
+            **kwargs,
+        )
+        self.config = config
+        # One engine for the whole process; cogs reach it through `bot.engine`.
+        self.engine = create_engine(config)
+        self.metrics = metrics
+        self.metrics.install(self.engine)
+        self.metrics_server = None
+        if config.get("SLOW_QUERY_MS", 100) is not None:
+            self.slow_queries = SlowQueryLog(
+                config.get("SLOW_QUERY_MS", 100),
+                config.get("SLOW_QUERY_LOG", "slow_queries.log"),
+                config.get("SLOW_QUERY_LOG_BYTES", 1_000_000),
+                config.get("SLOW_QUERY_LOG_BACKUPS", 3),
+            )
+            self.slow_queries.install(self.engine)
+        self.SessionLocal = async_sessionmaker(self.engine)
+        if config.get("WRITE_BEHIND", False):
+            self.balances = WriteBehindBalances(
+                self.engine,
+                config.get("WRITE_BEHIND_INTERVAL_MS", 50),
+                config.get("WRITE_BEHIND_BATCH_SIZE", 500),
+                config.get("WRITE_BEHIND_MAX_PENDING", 5000),
+                config.get("ACCOUNT_LOCK_STRIPES", 1024),
+                config.get("WRITE_BEHIND_CACHE_SIZE", 50000),
+            )
+        else:
+            self.balances = Balances(
+                self.engine, config.get("ACCOUNT_LOCK_STRIPES", 1024)
+            )
+        self.ledger = Ledger(
+            self.engine,
+            config.get("LEDGER_FLUSH_INTERVAL_MS", 1000),
+            config.get("LEDGER_BATCH_SIZE", 1000),
+            config.get("LEDGER_SNAPSHOT_MINUTES", 60),
+        )
+        self.balances.ledger = self.ledger
+        self.settings = SettingsCache(self.engine)
+        self.currencies = CurrencyRegistry(self.engine)
+        # Page 1 of /leaderboard is served from here, so it holds at least a page.
+        self.leaderboards = LeaderboardCache(
+            self.balances, max(25, config.get("LEADERBOARD_CACHE_SIZE", 50))
+        )
+        self.rankings = RankingCache(self.balances)
+        self.command_registry = CommandRegistry()
+        # Everything above lives on the bot, so reloading a cog keeps it.
+        # Cog-level state is parked here in cog_unload and picked up again
+        # by the reloaded cog's __init__.
+        self.cog_state: Dict[str, dict] = {}
+
+    def extension_names(self, root: str = "cogs") -> List[str]:
+        # Module paths are built from os.sep, so subpackages load on any OS.
+        names = []
+        for subdir, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            package = ".".join(os.path.normpath(subdir).split(os.sep))
+            files = [
+                file
+                for file in files
+                if file.endswith(".py")
+                and "template" not in file
+                and file != "__init__.py"
+            ]
+            names += [f"{package}.{file[:-3]}" for file in sorted(files)]
+        return names
+
+    async def load_extensions(self):
+        names = self.extension_names()
+        results = await asyncio.gather(
+            *(self.load_extension(name) for name in names), return_exceptions=True
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                print(f"Failed to load {name}: {result}")
+
+    async def warm_pool(self):
+        # Opens the pooled connections (and applies their pragmas) up front
+        # instead of on the first commands after startup.
+        async def touch():
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(touch() for _ in range(self.engine.pool.size())))
+
+    async def setup_hook(self):
+        # Runs once, after login and before the gateway connects, so a
+        # reconnect (which fires on_ready again) never reloads anything.
+        timings = {}
+
+        async def timed(name: str, coro):
+            start = time.perf_counter()
+            await coro
+            timings[name] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            timed("database", self.init_database()),
+            timed("extensions", self.load_extensions()),
+            timed("commands", self.command_registry.load(self.tree)),
+        )
+        await timed("pool", self.warm_pool())
+        if self.config.get("METRICS_PORT"):
+            await timed("metrics", self.start_metrics_server())
+        report = ", ".join(
+            f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()
+        )
+        print(f"Startup took {(time.perf_counter() - start) * 1000:.0f}ms: {report}")
+
+    async def start_metrics_server(self):
+        self.metrics_server = await start_server(
+            self.metrics,
+            self.config.get("METRICS_HOST", "127.0.0.1"),
+            self.config["METRICS_PORT"],
+        )
+
+    async def init_database(self):
+        if not os.path.exists(self.config["DATABASE"]):
+            print("Database not found.  Initalizing...")
+        # create_all skips existing tables; run_migrations brings older files up to date.
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Currency.metadata.create_all)
+            await conn.run_sync(Settings.metadata.create_all)
+            await conn.run_sync(Bank.metadata.create_all)
+            await conn.run_sync(Transaction.metadata.create_all)
+            await conn.run_sync(BalanceSnapshot.metadata.create_all)
+        await run_migrations(self.engine)
+        await self.settings.load()
+        await self.currencies.load()
+        await log_pragmas(self.engine, self.config)
+
+    async def close(self):
+        await super().close()
+        if self.metrics_server is not None:
+            await self.metrics_server.cleanup()
+        await self.balances.close()
+        await self.ledger.close()
+        await self.engine.dispose()
@@ -0,0 +1,75 @@
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# WAL lets `/leaderboard` readers run alongside the `/dice` writer; NORMAL
+# sync is durable under WAL except for the last commits on power loss.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -16000,
+    "mmap_size": 134217728,
+    "temp_store": "MEMORY",
+}
+
+
+def sqlite_pragmas(config: dict) -> dict:
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(config.get("SQLITE_PRAGMAS", {}))
+    for name in pragmas:
+        if not name.isidentifier():
+            raise ValueError(f"Invalid SQLite pragma name: {name!r}")
+    return pragmas
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # Reports how long each checkout waited for a free connection.
+    on_wait: Optional[Callable[[float], None]] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.on_wait is not None:
+                self.on_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.on_wait = self.on_wait
+        return pool
+
+
+def create_engine(config: dict) -> AsyncEngine:
+    # aiosqlite defaults to NullPool for file databases, which reopens the file
+    # and its worker thread on every checkout.  Keep a bounded pool instead.
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{config['DATABASE']}",
+        poolclass=TimedQueuePool,
+        pool_size=config.get("DATABASE_POOL_SIZE", 5),
+        max_overflow=config.get("DATABASE_MAX_OVERFLOW", 5),
+        pool_timeout=config.get("DATABASE_POOL_TIMEOUT", 30),
+    )
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+async def log_pragmas(engine: AsyncEngine, config: dict):
+    async with engine.connect() as conn:
+        in_effect = []
+        for name in sqlite_pragmas(config):
+            value = await conn.execute(text(f"PRAGMA {name}"))
+            in_effect.append(f"{name}={value.scalar()}")
+    print(f"SQLite pragmas: {', '.join(in_effect)}")
@@ -0,0 +1,135 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Append new migrations to the end; never edit one that has shipped.
+# Every statement must be safe on a database that create_all just built.
+MIGRATIONS = [
+    (
+        1,
+        "Merge duplicate currencies and make (guild_id, name) unique",
+        [
+            """
+            UPDATE bank SET currency_id = (
+                SELECT MIN(keep.id) FROM currency AS dup
+                JOIN currency AS keep
+                    ON keep.guild_id = dup.guild_id AND keep.name = dup.name
+                WHERE dup.id = bank.currency_id
+            )
+            WHERE currency_id IN (
+                SELECT dup.id FROM currency AS dup
+                JOIN currency AS keep
+                    ON keep.guild_id = dup.guild_id AND keep.name = dup.name
+                WHERE keep.id < dup.id
+            )
+            """,
+            """
+            DELETE FROM currency WHERE id NOT IN (
+                SELECT MIN(id) FROM currency GROUP BY guild_id, name
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_currency_guild_name "
+            "ON currency (guild_id, name)",
+        ],
+    ),
+    (
+        2,
+        "Merge duplicate bank accounts and index bank for lookups and leaderboards",
+        [
+            """
+            UPDATE bank SET amount = (
+                SELECT SUM(dup.amount) FROM bank AS dup
+                WHERE dup.guild_id = bank.guild_id
+                    AND dup.currency_id = bank.currency_id
+                    AND dup.user_id = bank.user_id
+            )
+            WHERE id IN (
+                SELECT MIN(id) FROM bank
+                GROUP BY guild_id, currency_id, user_id
+                HAVING COUNT(*) > 1
+            )
+            """,
+            """
+            DELETE FROM bank WHERE id NOT IN (
+                SELECT MIN(id) FROM bank GROUP BY guild_id, currency_id, user_id
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_bank_account "
+            "ON bank (guild_id, currency_id, user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_bank_leaderboard "
+            "ON bank (guild_id, currency_id, amount DESC)",
+        ],
+    ),
+    (
+        3,
+        "Merge duplicate settings rows and make guild_id unique",
+        [
+            # Admin updates were applied to every duplicate row, so they only
+            # differ in the values they were first inserted with.
+            """
+            UPDATE settings SET dice_win = (
+                SELECT MAX(dup.dice_win) FROM settings AS dup
+                WHERE dup.guild_id = settings.guild_id
+            )
+            WHERE dice_win IS NULL
+            """,
+            """
+            DELETE FROM settings WHERE id NOT IN (
+                SELECT MIN(id) FROM settings GROUP BY guild_id
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_settings_guild "
+            "ON settings (guild_id)",
+        ],
+    ),
+    (
+        4,
+        "Index bank by member for paged /balance",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_bank_member "
+            "ON bank (guild_id, user_id, amount DESC, currency_id)",
+        ],
+    ),
+    (
+        5,
+        "Seed an opening balance snapshot for the transaction ledger",
+        [
+            # Ledger replay starts from these rows; ledger_id 0 precedes every entry.
+            """
+            INSERT INTO balance_snapshots
+                (ts, guild_id, currency_id, user_id, amount, ledger_id)
+            SELECT CAST(strftime('%s', 'now') AS INTEGER) * 1000,
+                guild_id, currency_id, user_id, amount, 0
+            FROM bank
+            """,
+        ],
+    ),
+]
+
+
+async def run_migrations(engine: AsyncEngine):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "version INTEGER PRIMARY KEY, "
+                "description TEXT NOT NULL, "
+                "applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            )
+        )
+        current = await conn.execute(text("SELECT MAX(version) FROM schema_version"))
+        current = current.scalar() or 0
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        # One transaction per migration so a failure leaves the last good version.
+        async with engine.begin() as conn:
+            for statement in statements:
+                await conn.execute(text(statement))
+            await conn.execute(
+                text(
+                    "INSERT INTO schema_version (version, description) "
+                    "VALUES (:version, :description)"
+                ),
+                {"version": version, "description": description},
+            )
+        print(f"Applied migration {version}: {description}")
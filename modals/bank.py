@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, ForeignKey, Integer
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from modals.currency import Currency
@@ -15,3 +15,8 @@ class Bank(Base):
     guild_id: Mapped[int] = mapped_column(BigInteger)
     currency_id: Mapped[int] = mapped_column(Integer, ForeignKey(Currency.id))
     amount: Mapped[int] = mapped_column(Integer)
+
+
+Index("uq_bank_account", Bank.guild_id, Bank.currency_id, Bank.user_id, unique=True)
+Index("ix_bank_leaderboard", Bank.guild_id, Bank.currency_id, Bank.amount.desc())
+Index("ix_bank_member", Bank.guild_id, Bank.user_id, Bank.amount.desc(), Bank.currency_id)
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Integer
+from sqlalchemy import BigInteger, Index, Integer
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -13,3 +13,6 @@ class Settings(Base):
     dice_win: Mapped[int] = mapped_column(Integer, nullable=True)
     min_bet: Mapped[int] = mapped_column(Integer, default=10_000)
     max_bet: Mapped[int] = mapped_column(Integer, default=50_000)
+
+
+Index("uq_settings_guild", Settings.guild_id, unique=True)
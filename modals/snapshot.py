@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Index, Integer
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ts: Mapped[int] = mapped_column(BigInteger)
+    guild_id: Mapped[int] = mapped_column(BigInteger)
+    currency_id: Mapped[int] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    amount: Mapped[int] = mapped_column(Integer)
+    ledger_id: Mapped[int] = mapped_column(Integer)
+
+
+Index(
+    "ix_balance_snapshots_account",
+    BalanceSnapshot.guild_id,
+    BalanceSnapshot.currency_id,
+    BalanceSnapshot.user_id,
+    BalanceSnapshot.ledger_id,
+)
@@ -0,0 +1,35 @@
+from sqlalchemy import BigInteger, Index, Integer, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Transaction(Base):
+    __tablename__ = "transactions"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ts: Mapped[int] = mapped_column(BigInteger)
+    guild_id: Mapped[int] = mapped_column(BigInteger)
+    currency_id: Mapped[int] = mapped_column(Integer)
+    from_user_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    to_user_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    delta: Mapped[int] = mapped_column(Integer)
+    kind: Mapped[str] = mapped_column(String(8))
+    roll: Mapped[int] = mapped_column(Integer, nullable=True)
+
+
+Index(
+    "ix_transactions_to",
+    Transaction.guild_id,
+    Transaction.currency_id,
+    Transaction.to_user_id,
+    Transaction.id,
+)
+Index(
+    "ix_transactions_from",
+    Transaction.guild_id,
+    Transaction.currency_id,
+    Transaction.from_user_id,
+    Transaction.id,
+)
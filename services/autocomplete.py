@@ -0,0 +1,86 @@
+from typing import Dict, List, Set
+
+import discord
+from discord import app_commands
+
+# Discord rejects autocomplete responses with more than 25 choices.
+MAX_CHOICES = 25
+GRAM_SIZE = 3
+
+
+class NameIndex:
+    # Prefix trie plus an n-gram index over one guild's names, matched
+    # case-insensitively.  Names are few, so every trie node keeps the set
+    # of names below it and a prefix lookup is a walk of len(query) steps.
+    def __init__(self):
+        self._display: Dict[str, str] = {}
+        self._trie: dict = {"": set()}
+        self._grams: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._display)
+
+    @staticmethod
+    def _grams_of(key: str):
+        for size in range(1, GRAM_SIZE + 1):
+            for start in range(len(key) - size + 1):
+                yield key[start:start + size]
+
+    def add(self, name: str):
+        key = name.casefold()
+        self._display[key] = name
+        node = self._trie
+        node[""].add(key)
+        for char in key:
+            node = node.setdefault(char, {"": set()})
+            node[""].add(key)
+        for gram in self._grams_of(key):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def remove(self, name: str):
+        key = name.casefold()
+        if self._display.pop(key, None) is None:
+            return
+        node = self._trie
+        node[""].discard(key)
+        for char in key:
+            node = node[char]
+            node[""].discard(key)
+        for gram in self._grams_of(key):
+            self._grams[gram].discard(key)
+
+    def _prefixed(self, query: str) -> Set[str]:
+        node = self._trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node[""]
+
+    def _containing(self, query: str) -> Set[str]:
+        grams = [query[i:i + GRAM_SIZE] for i in range(max(len(query) - GRAM_SIZE, 0) + 1)]
+        candidates = min((self._grams.get(gram, set()) for gram in grams), key=len)
+        return {key for key in candidates if query in key}
+
+    def search(self, query: str, limit: int = MAX_CHOICES) -> List[str]:
+        query = query.casefold()
+        if query == "":
+            keys = sorted(self._display)
+        else:
+            prefixed = self._prefixed(query)
+            contained = self._containing(query) - prefixed
+            # Exact match first, then prefix matches, then other substrings.
+            keys = sorted(prefixed, key=lambda key: (key != query, len(key), key))
+            keys += sorted(contained, key=lambda key: (key.find(query), len(key), key))
+        return [self._display[key] for key in keys[:limit]]
+
+
+async def currency_name_autocomplete(
+    interaction: discord.Interaction, current: str
+) -> List[app_commands.Choice[str]]:
+    return [
+        app_commands.Choice(name=name, value=name)
+        for name in interaction.client.currencies.search(  # type: ignore
+            interaction.guild_id, current
+        )
+    ]
@@ -0,0 +1,465 @@
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from modals.bank import Bank
+from services.dice import DiceRun, play
+from services.locks import AccountLocks
+
+
+def _account(guild_id: int, currency_id: int, user_id: int):
+    return (
+        Bank.guild_id == guild_id,
+        Bank.currency_id == currency_id,
+        Bank.user_id == user_id,
+    )
+
+
+def _chunks(user_ids: List[int], size: int):
+    for start in range(0, len(user_ids), size):
+        yield user_ids[start : start + size]
+
+
+async def _amounts(
+    conn: AsyncConnection, guild_id: int, currency_id: int, user_ids: List[int]
+) -> Dict[int, int]:
+    rows = await conn.execute(
+        select(Bank.user_id, Bank.amount).where(
+            Bank.guild_id == guild_id,
+            Bank.currency_id == currency_id,
+            Bank.user_id.in_(user_ids),
+        )
+    )
+    return dict(rows.all())
+
+
+def _overlay(
+    rows: List[Tuple[int, int]],
+    cached: Dict[int, Optional[int]],
+    after: Optional[Tuple[int, int]],
+    limit: Optional[int],
+) -> List[Tuple[int, int]]:
+    # The query left out the accounts in `cached`; their in-memory amounts
+    # are merged back in the same (amount DESC, id) order.
+    if not cached:
+        return rows
+    rows = rows + [
+        (key, amount)
+        for key, amount in cached.items()
+        if amount is not None
+        and (after is None or (-amount, key) > (-after[0], after[1]))
+    ]
+    rows.sort(key=lambda row: (-row[1], row[0]))
+    return rows if limit is None else rows[:limit]
+
+
+class Balances:
+    # Every mutation is a single `amount = amount + :delta` statement so two
+    # concurrent commands on one account can never overwrite each other.
+    # Holding the account's stripe lock around it makes them queue in-process
+    # rather than retry on SQLITE_BUSY, and keeps listener calls in commit order.
+    def __init__(self, engine: AsyncEngine, lock_stripes: int = 1024):
+        self.engine = engine
+        self.locks = AccountLocks(lock_stripes)
+        # Called with (guild_id, currency_id, user_id, new_amount) after each
+        # committed mutation, so in-memory indexes can follow the bank table.
+        self.listeners: List[Callable[[int, int, int, int], None]] = []
+        # Optional services.ledger.Ledger; entries are recorded after commit.
+        self.ledger = None
+
+    def _notify(self, guild_id: int, currency_id: int, user_id: int, amount: int):
+        for listener in self.listeners:
+            listener(guild_id, currency_id, user_id, amount)
+
+    def _log(
+        self,
+        guild_id: int,
+        currency_id: int,
+        from_user_id: Optional[int],
+        to_user_id: Optional[int],
+        delta: int,
+        kind: str,
+        roll: Optional[int] = None,
+    ):
+        if self.ledger is not None and delta != 0:
+            self.ledger.record(
+                guild_id, currency_id, from_user_id, to_user_id, delta, kind, roll
+            )
+
+    async def flush(self):
+        # Every mutation is already committed; see WriteBehindBalances.
+        pass
+
+    def member_amounts(self, guild_id: int, user_id: int) -> Dict[int, Optional[int]]:
+        # {currency_id: amount} changed in memory but not yet committed to
+        # the bank table; member_balances() reads them in place of its rows.
+        return {}
+
+    def currency_amounts(
+        self, guild_id: int, currency_id: int
+    ) -> Dict[int, Optional[int]]:
+        # {user_id: amount}, as member_amounts.
+        return {}
+
+    async def member_balances(
+        self,
+        guild_id: int,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[Tuple[int, int]]:
+        # [(currency_id, amount), ...] by amount descending, starting after
+        # the (amount, currency_id) keyset cursor `after`, so every page is a
+        # seek on ix_bank_member instead of an OFFSET scan.
+        cached = self.member_amounts(guild_id, user_id)
+        query = select(Bank.currency_id, Bank.amount).where(
+            Bank.guild_id == guild_id, Bank.user_id == user_id
+        )
+        if cached:
+            query = query.where(Bank.currency_id.notin_(list(cached)))
+        if after is not None:
+            query = query.where(
+                or_(
+                    Bank.amount < after[0],
+                    and_(Bank.amount == after[0], Bank.currency_id > after[1]),
+                )
+            )
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                query.order_by(Bank.amount.desc(), Bank.currency_id.asc()).limit(limit)
+            )
+            return _overlay(list(rows.all()), cached, after, limit)
+
+    async def currency_balances(
+        self, guild_id: int, currency_id: int, limit: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        # [(user_id, amount), ...] by amount descending, then user id.
+        cached = self.currency_amounts(guild_id, currency_id)
+        query = select(Bank.user_id, Bank.amount).where(
+            Bank.guild_id == guild_id, Bank.currency_id == currency_id
+        )
+        if cached:
+            query = query.where(Bank.user_id.notin_(list(cached)))
+        query = query.order_by(Bank.amount.desc(), Bank.user_id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(query)
+            return _overlay(list(rows.all()), cached, None, limit)
+
+    async def discard_currency(self, guild_id: int, currency_id: int):
+        pass
+
+    async def forget(self, guild_id: int):
+        # Drops what is held in memory for the guild; see rewrite().
+        pass
+
+    @asynccontextmanager
+    async def rewrite(self, guild_id: int):
+        # For changing the guild's rows outside this service, as bank imports
+        # do: its mutations wait until the block exits, and start again from
+        # the rewritten rows rather than from anything held in memory.
+        async with self.locks.pause(guild_id):
+            await self.flush()
+            try:
+                yield
+            finally:
+                await self.forget(guild_id)
+
+    async def close(self):
+        pass
+
+    async def get(
+        self, guild_id: int, currency_id: int, user_id: int
+    ) -> Optional[int]:
+        async with self.engine.connect() as conn:
+            amount = await conn.execute(
+                select(Bank.amount).where(*_account(guild_id, currency_id, user_id))
+            )
+            return amount.scalar_one_or_none()
+
+    async def _adjust(
+        self,
+        conn: AsyncConnection,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        delta: int,
+        required: int,
+    ) -> Optional[int]:
+        new_amount = await conn.execute(
+            update(Bank)
+            .where(*_account(guild_id, currency_id, user_id), Bank.amount >= required)
+            .values(amount=Bank.amount + delta)
+            .returning(Bank.amount)
+        )
+        return new_amount.scalar_one_or_none()
+
+    async def _credit(
+        self,
+        conn: AsyncConnection,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        amount: int,
+    ) -> int:
+        # Relies on the uq_bank_account index, so two first-time credits to
+        # the same account can no longer create duplicate rows.
+        statement = sqlite_insert(Bank).values(
+            guild_id=guild_id,
+            currency_id=currency_id,
+            user_id=user_id,
+            amount=amount,
+        )
+        new_amount = await conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=[Bank.guild_id, Bank.currency_id, Bank.user_id],
+                set_={"amount": Bank.amount + statement.excluded.amount},
+            ).returning(Bank.amount)
+        )
+        return new_amount.scalar_one()
+
+    async def credit(
+        self, guild_id: int, currency_id: int, user_id: int, amount: int
+    ) -> int:
+        async with self.locks.hold((guild_id, currency_id, user_id)):
+            async with self.engine.begin() as conn:
+                new_amount = await self._credit(
+                    conn, guild_id, currency_id, user_id, amount
+                )
+            self._notify(guild_id, currency_id, user_id, new_amount)
+            self._log(guild_id, currency_id, None, user_id, amount, "print")
+        return new_amount
+
+    async def remove(
+        self, guild_id: int, currency_id: int, user_id: int, amount: int
+    ) -> Optional[Tuple[int, bool]]:
+        # Returns (new_amount, clamped_to_zero), or None if there is no account.
+        async with self.locks.hold((guild_id, currency_id, user_id)):
+            async with self.engine.begin() as conn:
+                new_amount = await self._adjust(
+                    conn, guild_id, currency_id, user_id, -amount, amount
+                )
+                clamped = new_amount is None
+                removed = amount
+                if clamped:
+                    # The failed UPDATE above already holds the write lock, so
+                    # the amount read here is the one being zeroed.
+                    removed = await conn.execute(
+                        select(Bank.amount).where(
+                            *_account(guild_id, currency_id, user_id)
+                        )
+                    )
+                    removed = removed.scalar_one_or_none()
+                    if removed is None:
+                        return None
+                    await conn.execute(
+                        update(Bank)
+                        .where(*_account(guild_id, currency_id, user_id))
+                        .values(amount=0)
+                    )
+                    new_amount = 0
+            self._notify(guild_id, currency_id, user_id, new_amount)  # type: ignore
+            self._log(guild_id, currency_id, user_id, None, removed, "remove")
+        return new_amount, clamped  # type: ignore
+
+    async def credit_many(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_ids: List[int],
+        amount: int,
+        chunk_size: int = 500,
+    ) -> int:
+        # One transaction for the whole payout, written as a chunked
+        # executemany upsert.  Returns how many accounts were credited.
+        user_ids = list(dict.fromkeys(user_ids))
+        accounts = [(guild_id, currency_id, user_id) for user_id in user_ids]
+        statement = sqlite_insert(Bank)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Bank.guild_id, Bank.currency_id, Bank.user_id],
+            set_={"amount": Bank.amount + statement.excluded.amount},
+        )
+        async with self.locks.hold(*accounts):
+            new_amounts: Dict[int, int] = {}
+            async with self.engine.begin() as conn:
+                for chunk in _chunks(user_ids, chunk_size):
+                    old = await _amounts(conn, guild_id, currency_id, chunk)
+                    await conn.execute(
+                        statement,
+                        [
+                            {
+                                "guild_id": guild_id,
+                                "currency_id": currency_id,
+                                "user_id": user_id,
+                                "amount": amount,
+                            }
+                            for user_id in chunk
+                        ],
+                    )
+                    for user_id in chunk:
+                        new_amounts[user_id] = old.get(user_id, 0) + amount
+            for user_id, new_amount in new_amounts.items():
+                self._notify(guild_id, currency_id, user_id, new_amount)
+                self._log(guild_id, currency_id, None, user_id, amount, "print")
+        return len(new_amounts)
+
+    async def remove_many(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_ids: List[int],
+        amount: int,
+        chunk_size: int = 500,
+    ) -> Tuple[int, int]:
+        # Returns (accounts debited, accounts clamped to zero); members
+        # without an account are skipped.  Each debit is `amount - removed`,
+        # where removed is read under the account locks.
+        user_ids = list(dict.fromkeys(user_ids))
+        accounts = [(guild_id, currency_id, user_id) for user_id in user_ids]
+        statement = (
+            update(Bank)
+            .where(
+                Bank.guild_id == bindparam("b_guild_id"),
+                Bank.currency_id == bindparam("b_currency_id"),
+                Bank.user_id == bindparam("b_user_id"),
+            )
+            .values(amount=Bank.amount - bindparam("removed"))
+        )
+        async with self.locks.hold(*accounts):
+            removed: Dict[int, Tuple[int, int]] = {}
+            async with self.engine.begin() as conn:
+                for chunk in _chunks(user_ids, chunk_size):
+                    old = await _amounts(conn, guild_id, currency_id, chunk)
+                    if not old:
+                        continue
+                    await conn.execute(
+                        statement,
+                        [
+                            {
+                                "b_guild_id": guild_id,
+                                "b_currency_id": currency_id,
+                                "b_user_id": user_id,
+                                "removed": min(amount, old_amount),
+                            }
+                            for user_id, old_amount in old.items()
+                        ],
+                    )
+                    for user_id, old_amount in old.items():
+                        removed[user_id] = (
+                            min(amount, old_amount),
+                            max(old_amount - amount, 0),
+                        )
+            for user_id, (delta, new_amount) in removed.items():
+                self._notify(guild_id, currency_id, user_id, new_amount)
+                self._log(guild_id, currency_id, user_id, None, delta, "remove")
+        clamped = sum(1 for delta, _ in removed.values() if delta < amount)
+        return len(removed), clamped
+
+    def _log_wager(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        bet: int,
+        won: bool,
+        roll: Optional[int],
+    ):
+        if won:
+            self._log(guild_id, currency_id, None, user_id, bet, "dice", roll)
+        else:
+            self._log(guild_id, currency_id, user_id, None, bet, "dice", roll)
+
+    async def wager(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        bet: int,
+        won: bool,
+        roll: Optional[int] = None,
+    ) -> Optional[int]:
+        # None means the member has no account or cannot cover the bet.
+        async with self.locks.hold((guild_id, currency_id, user_id)):
+            async with self.engine.begin() as conn:
+                new_amount = await self._adjust(
+                    conn, guild_id, currency_id, user_id, bet if won else -bet, bet
+                )
+            if new_amount is not None:
+                self._notify(guild_id, currency_id, user_id, new_amount)
+                self._log_wager(guild_id, currency_id, user_id, bet, won, roll)
+        return new_amount
+
+    def _log_run(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        bet: int,
+        run: DiceRun,
+        dice_win: int,
+    ):
+        for roll in run.rolls:
+            self._log_wager(guild_id, currency_id, user_id, bet, roll <= dice_win, roll)
+
+    async def wager_rolls(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        bet: int,
+        rolls: List[int],
+        dice_win: int,
+        stop_on_loss: bool = False,
+        stop_below: Optional[int] = None,
+    ) -> Optional[DiceRun]:
+        # Plays a whole series against the current balance and settles the
+        # net result in one update.  None means the member has no account.
+        async with self.locks.hold((guild_id, currency_id, user_id)):
+            async with self.engine.begin() as conn:
+                amount = await conn.execute(
+                    select(Bank.amount).where(*_account(guild_id, currency_id, user_id))
+                )
+                amount = amount.scalar_one_or_none()
+                if amount is None:
+                    return None
+                run = play(amount, bet, rolls, dice_win, stop_on_loss, stop_below)
+                if not run.rolls:
+                    return run
+                new_amount = await self._adjust(
+                    conn, guild_id, currency_id, user_id, run.net, amount
+                )
+                if new_amount is None:
+                    return None
+            self._notify(guild_id, currency_id, user_id, new_amount)
+            self._log_run(guild_id, currency_id, user_id, bet, run, dice_win)
+        return run._replace(balance=new_amount)
+
+    async def transfer(
+        self,
+        guild_id: int,
+        currency_id: int,
+        from_user_id: int,
+        to_user_id: int,
+        amount: int,
+    ) -> Optional[int]:
+        # Returns the sender's new balance, or None if they cannot cover it.
+        async with self.locks.hold(
+            (guild_id, currency_id, from_user_id), (guild_id, currency_id, to_user_id)
+        ):
+            async with self.engine.begin() as conn:
+                from_amount = await self._adjust(
+                    conn, guild_id, currency_id, from_user_id, -amount, amount
+                )
+                if from_amount is None:
+                    return None
+                to_amount = await self._credit(
+                    conn, guild_id, currency_id, to_user_id, amount
+                )
+            self._notify(guild_id, currency_id, from_user_id, from_amount)
+            self._notify(guild_id, currency_id, to_user_id, to_amount)
+            self._log(guild_id, currency_id, from_user_id, to_user_id, amount, "give")
+        return from_amount
@@ -0,0 +1,293 @@
+import asyncio
+import csv
+import json
+import os
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, TextIO, Tuple
+
+from sqlalchemy import delete, insert, literal, null, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import load_config
+from database import create_engine
+from modals.bank import Bank
+from modals.currency import Currency
+from modals.transaction import Transaction
+from services.balances import _amounts
+from services.currencies import CurrencyRegistry, normalize_name
+from services.ledger import now_ms
+
+FORMATS = ["csv", "jsonl"]
+MODES = ["merge", "replace"]
+FIELDS = ["currency", "user_id", "amount"]
+
+Row = Tuple[str, int, int]
+
+
+class ImportSummary(NamedTuple):
+    accounts: int
+    changed: int
+    currencies: int
+
+
+def _record(record: dict, line: int) -> Row:
+    try:
+        currency, user_id, amount = (record[field] for field in FIELDS)
+        user_id, amount = int(user_id), int(amount)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Line {line}: expected {', '.join(FIELDS)}, got {record}")
+    # Stored the way /admin create would store it, or lookups would miss it.
+    if isinstance(currency, str):
+        currency = normalize_name(currency)
+    if not isinstance(currency, str) or not currency.strip():
+        raise ValueError(f"Line {line}: missing currency name")
+    if amount < 0:
+        raise ValueError(f"Line {line}: amount cannot be negative")
+    return currency, user_id, amount
+
+
+def read_rows(f: TextIO, fmt: str) -> Iterator[Row]:
+    # Lazily, one line at a time, so a file of any size is read in flat memory.
+    if fmt == "csv":
+        for line, record in enumerate(csv.DictReader(f), 2):
+            yield _record(record, line)
+    else:
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {line}: {e}")
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line}: expected an object, got {record}")
+            yield _record(record, line)
+
+
+async def export_balances(
+    engine: AsyncEngine, guild_id: int, f: TextIO, fmt: str, chunk_size: int = 500
+) -> int:
+    # A server-side cursor hands over `chunk_size` rows at a time, and the
+    # uq_bank_account index already returns them in (currency, user) order.
+    query = (
+        select(Currency.name, Bank.user_id, Bank.amount)
+        .join(Currency, Currency.id == Bank.currency_id)
+        .where(Bank.guild_id == guild_id)
+        .order_by(Bank.currency_id, Bank.user_id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+    exported = 0
+    async with engine.connect() as conn:
+        result = await conn.stream(query)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                writer.writerows(rows)
+            else:
+                f.writelines(json.dumps(dict(zip(FIELDS, row))) + "\n" for row in rows)
+            exported += len(rows)
+    return exported
+
+
+async def _currency_ids(
+    conn: AsyncConnection,
+    currencies: CurrencyRegistry,
+    created: Dict[str, int],
+    guild_id: int,
+    names: Iterable[str],
+) -> Dict[str, int]:
+    ids = {}
+    for name in names:
+        currency_id = currencies.get_id(guild_id, name) or created.get(name.casefold())
+        if currency_id is None:
+            currency_id = await conn.execute(
+                insert(Currency)
+                .values(guild_id=guild_id, name=name)
+                .returning(Currency.id)
+            )
+            currency_id = created[name.casefold()] = currency_id.scalar_one()
+        ids[name] = currency_id
+    return ids
+
+
+async def _clear(conn: AsyncConnection, guild_id: int):
+    # Every balance being dropped is written to the ledger as an import debit,
+    # so point-in-time balances stay correct across a replace.
+    await conn.execute(
+        insert(Transaction).from_select(
+            [
+                "ts",
+                "guild_id",
+                "currency_id",
+                "from_user_id",
+                "to_user_id",
+                "delta",
+                "kind",
+            ],
+            select(
+                literal(now_ms()),
+                Bank.guild_id,
+                Bank.currency_id,
+                Bank.user_id,
+                null(),
+                Bank.amount,
+                literal("import"),
+            ).where(Bank.guild_id == guild_id, Bank.amount != 0),
+        )
+    )
+    await conn.execute(delete(Bank).where(Bank.guild_id == guild_id))
+
+
+async def import_balances(
+    engine: AsyncEngine,
+    currencies: CurrencyRegistry,
+    guild_id: int,
+    f: TextIO,
+    fmt: str,
+    mode: str = "merge",
+    chunk_size: int = 500,
+) -> ImportSummary:
+    # Merge overwrites the accounts in the file and leaves the rest alone;
+    # replace first drops every balance in the guild.  The whole file is
+    # read once to validate it before anything is written, then applied in
+    # a single transaction, so a bad line or a failed write changes nothing.
+    names = set()
+    rows = read_rows(f, fmt)
+    while True:
+        chunk: List[Row] = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        names.update(row[0] for row in chunk)
+        # Lets the bot serve other guilds while a large file is checked.
+        await asyncio.sleep(0)
+    f.seek(0)
+    statement = sqlite_insert(Bank)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Bank.guild_id, Bank.currency_id, Bank.user_id],
+        set_={"amount": statement.excluded.amount},
+    )
+    created: Dict[str, int] = {}
+    accounts = changed = 0
+    rows = read_rows(f, fmt)
+    try:
+        async with engine.begin() as conn:
+            ids = await _currency_ids(conn, currencies, created, guild_id, names)
+            if mode == "replace":
+                await _clear(conn, guild_id)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                # Later lines win when the file repeats an account.
+                amounts = {
+                    (ids[name], user_id): amount for name, user_id, amount in chunk
+                }
+                # One `user_id IN` per currency seeks on uq_bank_account; a
+                # (currency_id, user_id) row-value IN scans the whole guild.
+                old: Dict[Tuple[int, int], int] = {}
+                for currency_id in {currency_id for currency_id, _ in amounts}:
+                    users = [user for cid, user in amounts if cid == currency_id]
+                    found = await _amounts(conn, guild_id, currency_id, users)
+                    old.update(
+                        ((currency_id, user), amount) for user, amount in found.items()
+                    )
+                await conn.execute(
+                    statement,
+                    [
+                        {
+                            "guild_id": guild_id,
+                            "currency_id": currency_id,
+                            "user_id": user_id,
+                            "amount": amount,
+                        }
+                        for (currency_id, user_id), amount in amounts.items()
+                    ],
+                )
+                ts = now_ms()
+                entries = [
+                    {
+                        "ts": ts,
+                        "guild_id": guild_id,
+                        "currency_id": currency_id,
+                        "from_user_id": user_id if delta < 0 else None,
+                        "to_user_id": user_id if delta > 0 else None,
+                        "delta": abs(delta),
+                        "kind": "import",
+                        "roll": None,
+                    }
+                    for (currency_id, user_id), amount in amounts.items()
+                    if (delta := amount - old.get((currency_id, user_id), 0)) != 0
+                ]
+                if entries:
+                    await conn.execute(insert(Transaction), entries)
+                accounts += len(amounts)
+                changed += len(entries)
+    finally:
+        if created:
+            await currencies.load()
+    return ImportSummary(accounts, changed, len(created))
+
+
+async def _main(args):
+    # Uses the bot's pragmas when a config is present.  Stop the bot first:
+    # it keeps balances, leaderboards and rankings in memory and would not
+    # see an import made from here.  Use /admin import while it runs.
+    config = load_config(args.config) if os.path.exists(args.config) else {}
+    engine = create_engine(dict(config, DATABASE=args.database or config["DATABASE"]))
+    try:
+        if args.command == "export":
+            with open(args.file, "w", newline="", encoding="utf-8") as f:
+                count = await export_balances(
+                    engine, args.guild, f, args.format, args.chunk_size
+                )
+            print(f"Exported {count:,} balances to {args.file}")
+        else:
+            currencies = CurrencyRegistry(engine)
+            await currencies.load()
+            with open(args.file, newline="", encoding="utf-8") as f:
+                summary = await import_balances(
+                    engine,
+                    currencies,
+                    args.guild,
+                    f,
+                    args.format,
+                    args.mode,
+                    args.chunk_size,
+                )
+            print(
+                f"Imported {summary.accounts:,} balances ({summary.changed:,} changed, "
+                f"{summary.currencies:,} new currencies) from {args.file}"
+            )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    # Only the command line needs argparse; the bot imports this module too.
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Export a guild's balances to CSV/JSONL, or import them back.  "
+        "Stop the bot before importing; it does not see changes made from here."
+    )
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("file")
+    parser.add_argument("--guild", type=int, required=True)
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--mode", choices=MODES, default="merge")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--database", help="Overrides DATABASE from the config.")
+    args = parser.parse_args()
+    if args.database is None and not os.path.exists(args.config):
+        parser.error(f"{args.config} not found; pass --database")
+    if args.format is None:
+        args.format = "jsonl" if args.file.endswith(".jsonl") else "csv"
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
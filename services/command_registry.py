@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional, Union
+
+import discord
+from discord import app_commands
+
+Found = Union[app_commands.AppCommand, app_commands.AppCommandGroup]
+
+
+class CommandRegistry:
+    # Application commands as Discord last reported them, keyed by guild
+    # (None for global) and lowercased name.  Filled at startup and by the
+    # owner `sync` command, so building a mention needs no HTTP call.
+    def __init__(self):
+        self._commands: Dict[Optional[int], Dict[str, app_commands.AppCommand]] = {}
+
+    def update(
+        self,
+        commands: List[app_commands.AppCommand],
+        guild_id: Optional[int] = None,
+    ):
+        self._commands[guild_id] = {
+            command.name.lower(): command for command in commands
+        }
+
+    def clear(self, guild_id: Optional[int] = None):
+        self._commands.pop(guild_id, None)
+
+    async def load(self, tree: app_commands.CommandTree):
+        try:
+            self.update(await tree.fetch_commands())
+        except discord.HTTPException as e:
+            print(f"Could not fetch application commands: {e}")
+
+    def find(
+        self, name: str, group: Optional[str] = None, guild_id: Optional[int] = None
+    ) -> Optional[Found]:
+        # Guild-synced commands shadow global ones of the same name.
+        for scope in (guild_id, None):
+            commands = self._commands.get(scope, {})
+            if group is None:
+                command = commands.get(name.lower())
+                if command is not None:
+                    return command
+            else:
+                parent = commands.get(group.lower())
+                for child in parent.options if parent is not None else []:
+                    if child.name.lower() == name.lower():
+                        return child  # type: ignore
+        return None
+
+    def mention(
+        self, name: str, group: Optional[str] = None, guild_id: Optional[int] = None
+    ) -> str:
+        command = self.find(name, group, guild_id)
+        if command is not None:
+            return command.mention
+        return f"`/{group} {name}`" if group is not None else f"`/{name}`"
@@ -0,0 +1,77 @@
+import unicodedata
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from modals.bank import Bank
+from modals.currency import Currency
+from services.autocomplete import MAX_CHOICES, NameIndex
+
+
+def normalize_name(name: str) -> str:
+    # How /admin create stores names: accents folded, anything else non-ASCII dropped.
+    return unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+
+
+class CurrencyRegistry:
+    # Currencies only change through `/admin create` and `/admin destroy`,
+    # which go through this registry, so name lookups never hit the database.
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self._names: Dict[int, Dict[int, str]] = {}
+        self._ids: Dict[int, Dict[str, int]] = {}
+        self._index: Dict[int, NameIndex] = {}
+
+    def _add(self, guild_id: int, currency_id: int, name: str):
+        self._names.setdefault(guild_id, {})[currency_id] = name
+        self._ids.setdefault(guild_id, {})[name.casefold()] = currency_id
+        self._index.setdefault(guild_id, NameIndex()).add(name)
+
+    async def load(self):
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                select(Currency.id, Currency.guild_id, Currency.name)
+            )
+            self._names = {}
+            self._ids = {}
+            self._index = {}
+            for row in rows:
+                self._add(row.guild_id, row.id, row.name)
+
+    def get_id(self, guild_id: Optional[int], name: str) -> Optional[int]:
+        return self._ids.get(guild_id, {}).get(name.casefold())  # type: ignore
+
+    def get_name(self, guild_id: Optional[int], currency_id: int) -> Optional[str]:
+        return self._names.get(guild_id, {}).get(currency_id)  # type: ignore
+
+    def names(self, guild_id: Optional[int]) -> List[str]:
+        return sorted(self._names.get(guild_id, {}).values(), key=str.casefold)  # type: ignore
+
+    def search(
+        self, guild_id: Optional[int], current: str, limit: int = MAX_CHOICES
+    ) -> List[str]:
+        index = self._index.get(guild_id)  # type: ignore
+        if index is None:
+            return []
+        return index.search(current, limit)
+
+    async def create(self, guild_id: int, name: str) -> int:
+        async with self.engine.begin() as conn:
+            currency_id = await conn.execute(
+                insert(Currency)
+                .values(guild_id=guild_id, name=name)
+                .returning(Currency.id)
+            )
+            currency_id = currency_id.scalar_one()
+        self._add(guild_id, currency_id, name)
+        return currency_id
+
+    async def destroy(self, guild_id: int, currency_id: int):
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(Currency).filter_by(id=currency_id))
+            await conn.execute(delete(Bank).filter_by(currency_id=currency_id))
+        name = self._names.get(guild_id, {}).pop(currency_id, None)
+        if name is not None:
+            self._ids[guild_id].pop(name.casefold(), None)
+            self._index[guild_id].remove(name)
@@ -0,0 +1,47 @@
+import random
+from typing import List, NamedTuple, Optional
+
+
+class DiceRun(NamedTuple):
+    rolls: List[int]
+    wins: int
+    losses: int
+    longest_streak: int
+    net: int
+    balance: int
+
+
+def roll_many(count: int) -> List[int]:
+    # One call into the RNG for the whole series, same 0-100 range as /dice.
+    return random.choices(range(101), k=count)
+
+
+def play(
+    balance: int,
+    bet: int,
+    rolls: List[int],
+    dice_win: int,
+    stop_on_loss: bool = False,
+    stop_below: Optional[int] = None,
+) -> DiceRun:
+    # Plays the rolls in order against `balance`, stopping early once the bet
+    # can no longer be covered or a stop condition is hit.
+    played: List[int] = []
+    wins = losses = streak = longest = 0
+    start = balance
+    for roll in rolls:
+        if balance < bet or (stop_below is not None and balance < stop_below):
+            break
+        played.append(roll)
+        if roll <= dice_win:
+            balance += bet
+            wins += 1
+            streak += 1
+            longest = max(longest, streak)
+        else:
+            balance -= bet
+            losses += 1
+            streak = 0
+            if stop_on_loss:
+                break
+    return DiceRun(played, wins, losses, longest, balance - start, balance)
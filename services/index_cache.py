@@ -0,0 +1,76 @@
+import asyncio
+from typing import Dict, Generic, List, Tuple, TypeVar
+
+from services.balances import Balances
+
+Key = Tuple[int, int]
+Index = TypeVar("Index")
+
+
+class IndexCache(Generic[Index]):
+    # Per-(guild, currency) indexes built lazily by `_build` and then kept
+    # current by Balances.listeners.  Subclasses supply the query and say
+    # when an index can no longer follow updates.
+    def __init__(self, balances: Balances):
+        self.balances = balances
+        self._indexes: Dict[Key, Index] = {}
+        self._loading: Dict[Key, List[Tuple[int, int]]] = {}
+        self._tasks: Dict[Key, asyncio.Future] = {}
+        # Bumped by forget(), so a load that started before it is not kept.
+        self._generations: Dict[Key, int] = {}
+        balances.listeners.append(self.record)
+
+    def _usable(self, index: Index) -> bool:
+        return True
+
+    def record(self, guild_id: int, currency_id: int, user_id: int, amount: int):
+        key = (guild_id, currency_id)
+        if key in self._loading:
+            self._loading[key].append((user_id, amount))
+        index = self._indexes.get(key)
+        if index is not None and self._usable(index):
+            index.update(user_id, amount)  # type: ignore
+
+    def forget(self, guild_id: int, currency_id: int):
+        key = (guild_id, currency_id)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._indexes.pop(key, None)
+        self._loading.pop(key, None)
+        self._tasks.pop(key, None)
+
+    async def _build(self, key: Key) -> Index:
+        raise NotImplementedError
+
+    async def _load(self, key: Key, generation: int) -> Index:
+        # A load forgotten before or during its query hands its waiters the
+        # next load instead of rows that may predate the forget().
+        if self._generations.get(key, 0) != generation:
+            return await self.get(*key)
+        pending = self._loading[key] = []
+        try:
+            index = await self._build(key)
+        finally:
+            if self._generations.get(key, 0) == generation:
+                del self._loading[key]
+                del self._tasks[key]
+        if self._generations.get(key, 0) != generation:
+            return await self.get(*key)
+        # Updates carry absolute amounts, so replaying the ones that raced
+        # the query is safe whether or not the query already saw them.
+        for user_id, amount in pending:
+            if self._usable(index):
+                index.update(user_id, amount)  # type: ignore
+        self._indexes[key] = index
+        return index
+
+    async def get(self, guild_id: int, currency_id: int) -> Index:
+        key = (guild_id, currency_id)
+        index = self._indexes.get(key)
+        if index is not None and self._usable(index):
+            return index
+        # Concurrent first requests share one load.
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(
+                self._load(key, self._generations.get(key, 0))
+            )
+        return await self._tasks[key]
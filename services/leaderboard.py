@@ -0,0 +1,65 @@
+import bisect
+from typing import List, Tuple
+
+from services.balances import Balances
+from services.index_cache import IndexCache, Key
+
+
+class TopK:
+    # Sorted (-amount, user_id) keys of the best `size` accounts.  `complete`
+    # means every account of the currency is held, not just the best ones.
+    def __init__(self, size: int, rows, complete: bool):
+        self.size = size
+        self.complete = complete
+        self.stale = False
+        self.keys = sorted((-amount, user_id) for user_id, amount in rows)
+        self.amounts = {user_id: amount for user_id, amount in rows}
+
+    def _insert(self, user_id: int, amount: int):
+        bisect.insort(self.keys, (-amount, user_id))
+        self.amounts[user_id] = amount
+
+    def update(self, user_id: int, amount: int):
+        key = (-amount, user_id)
+        if user_id in self.amounts:
+            old = (-self.amounts.pop(user_id), user_id)
+            floor = self.keys[-1]
+            self.keys.remove(old)
+            # Accounts outside the cache all rank after the old floor, so the
+            # new key is only safe to keep if it does not fall past it.
+            if self.complete or key <= floor:
+                self._insert(user_id, amount)
+            else:
+                self.stale = True
+        elif self.complete or key < self.keys[-1]:
+            self._insert(user_id, amount)
+            if len(self.keys) > self.size:
+                _, dropped = self.keys.pop()
+                del self.amounts[dropped]
+                self.complete = False
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        return [(user_id, -amount) for amount, user_id in self.keys[:limit]]
+
+
+class LeaderboardCache(IndexCache[TopK]):
+    # Built lazily per (guild, currency) from one indexed query and then kept
+    # current by Balances.listeners; only a member falling out of the cached
+    # top forces another query.
+    def __init__(self, balances: Balances, size: int = 50):
+        super().__init__(balances)
+        self.size = size
+
+    def _usable(self, board: TopK) -> bool:
+        return not board.stale
+
+    async def _build(self, key: Key) -> TopK:
+        # One row past the board tells whether it holds every account.
+        rows = await self.balances.currency_balances(*key, self.size + 1)
+        return TopK(self.size, rows[: self.size], len(rows) <= self.size)
+
+    async def top(
+        self, guild_id: int, currency_id: int, limit: int
+    ) -> List[Tuple[int, int]]:
+        board = await self.get(guild_id, currency_id)
+        return board.top(limit)
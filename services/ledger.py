@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import time
+from typing import List, Optional
+
+from sqlalchemy import func, insert, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from modals.snapshot import BalanceSnapshot
+from modals.transaction import Transaction
+
+# Snapshots are built from the ledger alone, never from `bank`, so a balance
+# mutation whose ledger entry is still buffered cannot be counted twice.
+# Only accounts touched since the previous snapshot get a new row.
+SNAPSHOT_SQL = """
+INSERT INTO balance_snapshots (ts, guild_id, currency_id, user_id, amount, ledger_id)
+SELECT :ts, d.guild_id, d.currency_id, d.user_id,
+    COALESCE((
+        SELECT s.amount FROM balance_snapshots AS s
+        WHERE s.guild_id = d.guild_id
+            AND s.currency_id = d.currency_id
+            AND s.user_id = d.user_id
+        ORDER BY s.ledger_id DESC LIMIT 1
+    ), 0) + SUM(d.delta),
+    :upto
+FROM (
+    SELECT guild_id, currency_id, to_user_id AS user_id, delta FROM transactions
+    WHERE id > :prev AND id <= :upto AND to_user_id IS NOT NULL
+    UNION ALL
+    SELECT guild_id, currency_id, from_user_id AS user_id, -delta FROM transactions
+    WHERE id > :prev AND id <= :upto AND from_user_id IS NOT NULL
+) AS d
+GROUP BY d.guild_id, d.currency_id, d.user_id
+"""
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Ledger:
+    # Append-only history of every balance mutation.  Entries are buffered
+    # and inserted in batches off the command path.
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval_ms: int = 1000,
+        batch_size: int = 1000,
+        snapshot_minutes: int = 60,
+    ):
+        self.engine = engine
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self.snapshot_interval = snapshot_minutes * 60
+        self._buffer: List[dict] = []
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def record(
+        self,
+        guild_id: int,
+        currency_id: int,
+        from_user_id: Optional[int],
+        to_user_id: Optional[int],
+        delta: int,
+        kind: str,
+        roll: Optional[int] = None,
+    ):
+        if self._task is None:
+            # A fresh context, so the flusher's queries are not counted
+            # against the command that happened to start it.
+            self._task = asyncio.create_task(
+                self._run(), context=contextvars.Context()
+            )
+        self._buffer.append(
+            {
+                "ts": now_ms(),
+                "guild_id": guild_id,
+                "currency_id": currency_id,
+                "from_user_id": from_user_id,
+                "to_user_id": to_user_id,
+                "delta": delta,
+                "kind": kind,
+                "roll": roll,
+            }
+        )
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self):
+        last_snapshot = time.monotonic()
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - last_snapshot >= self.snapshot_interval:
+                    await self.snapshot()
+                    last_snapshot = time.monotonic()
+            except Exception as e:
+                print(f"Ledger flush failed, will retry: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            buffer, self._buffer = self._buffer, []
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(insert(Transaction), buffer)
+            except Exception:
+                self._buffer[:0] = buffer
+                raise
+
+    async def snapshot(self):
+        await self.flush()
+        async with self.engine.begin() as conn:
+            prev = await conn.execute(select(func.max(BalanceSnapshot.ledger_id)))
+            upto = await conn.execute(select(func.max(Transaction.id)))
+            prev, upto = prev.scalar() or 0, upto.scalar() or 0
+            if upto > prev:
+                await conn.execute(
+                    text(SNAPSHOT_SQL), {"ts": now_ms(), "prev": prev, "upto": upto}
+                )
+
+    async def close(self):
+        # Cancelling mid-flush could leave a write transaction open, so the
+        # task is asked to finish its current batch and stop instead.
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def balance_at(
+        self, guild_id: int, currency_id: int, user_id: int, ts: int
+    ) -> int:
+        # Nearest snapshot at or before `ts`, plus the entries after it.
+        await self.flush()
+        async with self.engine.connect() as conn:
+            base = await conn.execute(
+                select(BalanceSnapshot.amount, BalanceSnapshot.ledger_id)
+                .filter_by(guild_id=guild_id, currency_id=currency_id, user_id=user_id)
+                .where(BalanceSnapshot.ts <= ts)
+                .order_by(BalanceSnapshot.ledger_id.desc())
+                .limit(1)
+            )
+            base = base.one_or_none()
+            amount, after = (base.amount, base.ledger_id) if base else (0, 0)
+            credits = await conn.execute(
+                select(func.coalesce(func.sum(Transaction.delta), 0)).where(
+                    Transaction.guild_id == guild_id,
+                    Transaction.currency_id == currency_id,
+                    Transaction.to_user_id == user_id,
+                    Transaction.id > after,
+                    Transaction.ts <= ts,
+                )
+            )
+            debits = await conn.execute(
+                select(func.coalesce(func.sum(Transaction.delta), 0)).where(
+                    Transaction.guild_id == guild_id,
+                    Transaction.currency_id == currency_id,
+                    Transaction.from_user_id == user_id,
+                    Transaction.id > after,
+                    Transaction.ts <= ts,
+                )
+            )
+            return amount + credits.scalar_one() - debits.scalar_one()
+
+    async def history(
+        self, guild_id: int, currency_id: int, user_id: int, limit: int = 10
+    ):
+        await self.flush()
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                select(Transaction)
+                .where(
+                    Transaction.guild_id == guild_id,
+                    Transaction.currency_id == currency_id,
+                    or_(
+                        Transaction.to_user_id == user_id,
+                        Transaction.from_user_id == user_id,
+                    ),
+                )
+                .order_by(Transaction.id.desc())
+                .limit(limit)
+            )
+            return rows.all()
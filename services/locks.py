@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
+
+Account = Tuple[int, int, int]
+
+
+class AccountLocks:
+    # A fixed pool of locks shared by all (guild, currency, user) accounts.
+    # Mutations on one account queue here instead of contending for SQLite's
+    # writer lock; unrelated accounts only wait on each other when they
+    # happen to hash to the same stripe.
+    def __init__(self, stripes: int = 1024):
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+        # Per guild: holds in progress, and the events that end a pause and
+        # tell a pausing task the last of those holds has finished.
+        self._active: Dict[int, int] = {}
+        self._resumed: Dict[int, asyncio.Event] = {}
+        self._drained: Dict[int, asyncio.Event] = {}
+
+    def _stripe(self, account: Account) -> int:
+        return hash(account) % len(self._locks)
+
+    def locked(self, account: Account) -> bool:
+        return self._locks[self._stripe(account)].locked()
+
+    @asynccontextmanager
+    async def hold(self, *accounts: Account):
+        # Stripes are taken in ascending order, so two transfers running in
+        # opposite directions cannot deadlock, and a stripe shared by both
+        # accounts is only taken once.
+        guilds = {account[0] for account in accounts}
+        while True:
+            resumed = next(
+                (self._resumed[guild] for guild in guilds if guild in self._resumed),
+                None,
+            )
+            if resumed is None:
+                break
+            await resumed.wait()
+        for guild in guilds:
+            self._active[guild] = self._active.get(guild, 0) + 1
+        stripes = sorted({self._stripe(account) for account in accounts})
+        acquired: List[asyncio.Lock] = []
+        try:
+            for stripe in stripes:
+                await self._locks[stripe].acquire()
+                acquired.append(self._locks[stripe])
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+            for guild in guilds:
+                self._active[guild] -= 1
+                if not self._active[guild]:
+                    del self._active[guild]
+                    if guild in self._drained:
+                        self._drained.pop(guild).set()
+
+    @asynccontextmanager
+    async def pause(self, guild_id: int):
+        # Waits for the guild's holds in progress to finish, then keeps new
+        # ones waiting until the block exits.
+        while guild_id in self._resumed:
+            await self._resumed[guild_id].wait()
+        resumed = self._resumed[guild_id] = asyncio.Event()
+        try:
+            if guild_id in self._active:
+                drained = self._drained[guild_id] = asyncio.Event()
+                await drained.wait()
+            yield
+        finally:
+            del self._resumed[guild_id]
+            self._drained.pop(guild_id, None)
+            resumed.set()
@@ -0,0 +1,275 @@
+import bisect
+import contextvars
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import discord
+from discord import app_commands
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Upper bounds in seconds; the last bucket catches everything else.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASES = ("total", "respond", "db", "followup", "pool_wait")
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation.
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+        return 0.0
+
+
+class CommandStats:
+    # Accumulates one invocation; the current one lives in `_current` so the
+    # engine, pool and HTTP hooks can find it without being passed it.
+    def __init__(self, name: str, interaction: discord.Interaction):
+        self.name = name
+        self.interaction = interaction
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.queries = 0
+        self.rows_written = 0
+
+
+_current: contextvars.ContextVar[Optional[CommandStats]] = contextvars.ContextVar(
+    "command_stats", default=None
+)
+
+
+def current_command() -> Optional[CommandStats]:
+    return _current.get()
+
+
+def command_name(data: dict) -> str:
+    parts = [data.get("name", "?")]
+    options = data.get("options", [])
+    # Subcommand groups (2) and subcommands (1) nest their own options.
+    while options and options[0].get("type") in (1, 2):
+        parts.append(options[0]["name"])
+        options = options[0].get("options", [])
+    return " ".join(parts)
+
+
+class Metrics:
+    def __init__(self, autocomplete_deadline_ms: int = 2500):
+        self.autocomplete_deadline = autocomplete_deadline_ms / 1000
+        self.started = time.time()
+        self.histograms: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.autocomplete: Dict[str, Histogram] = defaultdict(Histogram)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.queries: Dict[str, int] = defaultdict(int)
+        self.rows_written: Dict[str, int] = defaultdict(int)
+        self.deadline_misses: Dict[str, int] = defaultdict(int)
+        self.pool_wait = Histogram()
+        self.total_queries = 0
+
+    def install(self, engine: AsyncEngine):
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+        engine.pool.on_wait = self._pool_wait  # type: ignore
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        conn.info["metrics_start"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        self.total_queries += 1
+        stats = _current.get()
+        start = conn.info.pop("metrics_start", None)
+        if stats is None:
+            return
+        if start is not None:
+            stats.phases["db"] += time.perf_counter() - start
+        stats.queries += 1
+        # DB-API rowcount is only defined for writes; it is -1 for SELECTs.
+        if cursor.rowcount > 0:
+            stats.rows_written += cursor.rowcount
+
+    def _pool_wait(self, seconds: float):
+        self.pool_wait.observe(seconds)
+        stats = _current.get()
+        if stats is not None:
+            stats.phases["pool_wait"] += seconds
+
+    def http_trace(self) -> aiohttp.TraceConfig:
+        # Passed to the bot as `http_trace`; interaction responses and
+        # followups go through the bot's HTTP session, so their round trips
+        # are timed here without wrapping any discord.py methods.
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._request_start)
+        trace.on_request_end.append(self._request_end)
+        trace.on_request_exception.append(self._request_end)
+        return trace
+
+    async def _request_start(self, session, context, params):
+        context.start = time.perf_counter()
+
+    async def _request_end(self, session, context, params):
+        stats = _current.get()
+        if stats is None:
+            return
+        path = params.url.path
+        if "/interactions/" in path:
+            phase = "respond"
+        elif "/webhooks/" in path:
+            phase = "followup"
+        else:
+            return
+        stats.phases[phase] += time.perf_counter() - context.start
+        # Sending the choices is the last thing an autocomplete does.
+        if (
+            phase == "respond"
+            and stats.interaction.type is discord.InteractionType.autocomplete
+        ):
+            self.finish_autocomplete(stats)
+
+    def begin(self, name: str, interaction: discord.Interaction) -> CommandStats:
+        stats = CommandStats(name, interaction)
+        interaction.extras["metrics"] = stats
+        _current.set(stats)
+        return stats
+
+    def finish(self, interaction: discord.Interaction, failed: bool):
+        stats = interaction.extras.pop("metrics", None)
+        if stats is None:
+            return
+        name = stats.name
+        stats.phases["total"] = time.perf_counter() - stats.start
+        self.calls[name] += 1
+        if failed:
+            self.errors[name] += 1
+        self.queries[name] += stats.queries
+        self.rows_written[name] += stats.rows_written
+        for phase in PHASES:
+            self.histograms[(name, phase)].observe(stats.phases.get(phase, 0.0))
+
+    def finish_autocomplete(self, stats: CommandStats):
+        if stats.interaction.extras.pop("metrics", None) is None:
+            return
+        elapsed = time.perf_counter() - stats.start
+        self.autocomplete[stats.name].observe(elapsed)
+        if elapsed > self.autocomplete_deadline:
+            self.deadline_misses[stats.name] += 1
+
+    def summary(self) -> List[dict]:
+        rows = []
+        for name, calls in sorted(self.calls.items(), key=lambda item: -item[1]):
+            total = self.histograms[(name, "total")]
+            rows.append(
+                {
+                    "command": name,
+                    "calls": calls,
+                    "errors": self.errors[name],
+                    "p50": total.quantile(0.5),
+                    "p95": total.quantile(0.95),
+                    "p99": total.quantile(0.99),
+                    "db_p95": self.histograms[(name, "db")].quantile(0.95),
+                    "queries": self.queries[name] / calls,
+                    "rows_written": self.rows_written[name] / calls,
+                }
+            )
+        return rows
+
+    def prometheus(self) -> str:
+        lines = ["# TYPE currency_bot_command_seconds histogram"]
+        for (name, phase), histogram in sorted(self.histograms.items()):
+            lines += _histogram_lines(
+                "currency_bot_command_seconds",
+                f'command="{name}",phase="{phase}"',
+                histogram,
+            )
+        lines.append("# TYPE currency_bot_autocomplete_seconds histogram")
+        for name, histogram in sorted(self.autocomplete.items()):
+            lines += _histogram_lines(
+                "currency_bot_autocomplete_seconds", f'command="{name}"', histogram
+            )
+        for metric, values in (
+            ("currency_bot_command_errors_total", self.errors),
+            ("currency_bot_command_queries_total", self.queries),
+            ("currency_bot_command_rows_written_total", self.rows_written),
+            ("currency_bot_autocomplete_deadline_misses_total", self.deadline_misses),
+        ):
+            lines.append(f"# TYPE {metric} counter")
+            for name, value in sorted(values.items()):
+                lines.append(f'{metric}{{command="{name}"}} {value}')
+        lines.append("# TYPE currency_bot_pool_wait_seconds histogram")
+        lines += _histogram_lines("currency_bot_pool_wait_seconds", "", self.pool_wait)
+        lines.append("# TYPE currency_bot_queries_total counter")
+        lines.append(f"currency_bot_queries_total {self.total_queries}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric: str, labels: str, histogram: Histogram) -> List[str]:
+    prefix = f"{labels}," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+        lines.append(f'{metric}_bucket{{{prefix}le="{le}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {histogram.sum:.6f}")
+    lines.append(f"{metric}_count{suffix} {histogram.count}")
+    return lines
+
+
+class MeteredCommandTree(app_commands.CommandTree):
+    # Measures every app command and autocomplete request through public
+    # hooks only: interaction_check starts the clock, and the completion
+    # event or on_error stops it.
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        client.add_listener(self._completed, "on_app_command_completion")
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Each interaction runs in its own task, so the stats set here stay
+        # current for the rest of the command and go away with the task.
+        metrics: Metrics = self.client.metrics  # type: ignore
+        metrics.begin(command_name(interaction.data or {}), interaction)  # type: ignore
+        return True
+
+    async def _completed(self, interaction: discord.Interaction, command):
+        self.client.metrics.finish(interaction, False)  # type: ignore
+
+    async def on_error(
+        self, interaction: discord.Interaction, error: app_commands.AppCommandError
+    ):
+        self.client.metrics.finish(interaction, True)  # type: ignore
+        await super().on_error(interaction, error)
+
+
+async def start_server(metrics: Metrics, host: str, port: int):
+    # Optional Prometheus scrape target; aiohttp already ships with discord.py.
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(
+            text=metrics.prometheus(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Metrics served on http://{host}:{port}/metrics")
+    return runner
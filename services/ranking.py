@@ -0,0 +1,133 @@
+import bisect
+from typing import Dict, List, Tuple
+
+from services.index_cache import IndexCache, Key
+
+
+class OrderStatisticList:
+    # Sorted buckets of at most 2 * LOAD keys with a Fenwick tree over the
+    # bucket sizes, so rank and position lookups are O(log n) plus a short
+    # bisect/memmove inside one bucket.
+    LOAD = 256
+
+    def __init__(self, keys: List[Key]):
+        self._buckets = [
+            keys[start:start + self.LOAD] for start in range(0, len(keys), self.LOAD)
+        ]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._tree = [0] * (len(self._buckets) + 1)
+        for index, bucket in enumerate(self._buckets):
+            self._grow(index, len(bucket))
+
+    def _grow(self, index: int, delta: int):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def _before(self, index: int) -> int:
+        # Number of keys in the buckets before `index`.
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        index = 0
+        step = 1 << len(self._tree).bit_length()
+        while step:
+            if index + step < len(self._tree) and self._tree[index + step] <= position:
+                index += step
+                position -= self._tree[index]
+            step >>= 1
+        return index, position
+
+    def __len__(self):
+        return self._before(len(self._buckets))
+
+    def add(self, key: Key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._rebuild()
+            return
+        index = min(bisect.bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[index]
+        bisect.insort(bucket, key)
+        self._maxes[index] = bucket[-1]
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[index:index + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._rebuild()
+        else:
+            self._grow(index, 1)
+
+    def remove(self, key: Key):
+        index = bisect.bisect_left(self._maxes, key)
+        bucket = self._buckets[index]
+        del bucket[bisect.bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[index] = bucket[-1]
+            self._grow(index, -1)
+        else:
+            del self._buckets[index]
+            self._rebuild()
+
+    def rank(self, key: Key) -> int:
+        # Number of keys ordered before `key`.
+        index = bisect.bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            return len(self)
+        return self._before(index) + bisect.bisect_left(self._buckets[index], key)
+
+    def slice(self, start: int, stop: int) -> List[Key]:
+        if start >= len(self):
+            return []
+        index, offset = self._locate(start)
+        keys: List[Key] = []
+        while index < len(self._buckets) and len(keys) < stop - start:
+            keys.extend(self._buckets[index][offset:offset + stop - start - len(keys)])
+            index, offset = index + 1, 0
+        return keys
+
+
+class RankIndex:
+    def __init__(self, rows):
+        self.amounts: Dict[int, int] = {user_id: amount for user_id, amount in rows}
+        self.keys = OrderStatisticList([(-amount, user_id) for user_id, amount in rows])
+
+    def update(self, user_id: int, amount: int):
+        if user_id in self.amounts:
+            self.keys.remove((-self.amounts[user_id], user_id))
+        self.amounts[user_id] = amount
+        self.keys.add((-amount, user_id))
+
+
+class RankingCache(IndexCache[RankIndex]):
+    # Full per-(guild, currency) order-statistic index for /rank and deep
+    # leaderboard pages.  Loaded lazily, then kept current by Balances.listeners.
+    async def _build(self, key: Key) -> RankIndex:
+        return RankIndex(await self.balances.currency_balances(*key))
+
+    async def rank(
+        self, guild_id: int, currency_id: int, user_id: int
+    ) -> Tuple[int, int, int]:
+        # Returns (1-based rank, amount, total accounts); rank 0 if none.
+        index = await self.get(guild_id, currency_id)
+        amount = index.amounts.get(user_id)
+        if amount is None:
+            return 0, 0, len(index.keys)
+        return index.keys.rank((-amount, user_id)) + 1, amount, len(index.keys)
+
+    async def page(
+        self, guild_id: int, currency_id: int, start: int, count: int
+    ) -> Tuple[List[Tuple[int, int]], int]:
+        # Returns ([(user_id, amount), ...], total accounts).
+        index = await self.get(guild_id, currency_id)
+        entries = [
+            (user_id, -amount)
+            for amount, user_id in index.keys.slice(start, start + count)
+        ]
+        return entries, len(index.keys)
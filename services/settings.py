@@ -0,0 +1,51 @@
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from modals.settings import Settings
+
+
+class GuildSettings(NamedTuple):
+    dice_win: Optional[int]
+    min_bet: int
+    max_bet: int
+
+
+class SettingsCache:
+    # Settings only change through the admin commands, which write through
+    # `update`, so lookups never need to touch the database.
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self._guilds: Dict[int, GuildSettings] = {}
+
+    async def load(self):
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(
+                select(
+                    Settings.guild_id,
+                    Settings.dice_win,
+                    Settings.min_bet,
+                    Settings.max_bet,
+                )
+            )
+            self._guilds = {
+                row.guild_id: GuildSettings(row.dice_win, row.min_bet, row.max_bet)
+                for row in rows
+            }
+
+    def get(self, guild_id: Optional[int]) -> Optional[GuildSettings]:
+        return self._guilds.get(guild_id)  # type: ignore
+
+    async def update(self, guild_id: int, **values) -> GuildSettings:
+        statement = sqlite_insert(Settings).values(guild_id=guild_id, **values)
+        async with self.engine.begin() as conn:
+            row = await conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[Settings.guild_id], set_=values
+                ).returning(Settings.dice_win, Settings.min_bet, Settings.max_bet)
+            )
+            row = row.one()
+        self._guilds[guild_id] = GuildSettings(row.dice_win, row.min_bet, row.max_bet)
+        return self._guilds[guild_id]
@@ -0,0 +1,97 @@
+import logging
+import re
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from services.metrics import current_command
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+MAX_SHAPES = 1000
+
+
+def shape(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def caller() -> str:
+    stats = current_command()
+    if stats is None:
+        return "background"
+    command = stats.interaction.command
+    if command is None:
+        return f"/{stats.name}"
+    cog = getattr(command, "binding", None)
+    callback = getattr(command, "callback", None)
+    where = getattr(callback, "__name__", command.name)
+    if cog is not None:
+        where = f"{type(cog).__name__}.{where}"
+    return f"{where} (/{stats.name})"
+
+
+class SlowQueryLog:
+    # Logs statements slower than `threshold_ms` with the command that ran
+    # them, plus EXPLAIN QUERY PLAN the first time each statement is seen.
+    def __init__(
+        self,
+        threshold_ms: float = 100,
+        path: str = "slow_queries.log",
+        max_bytes: int = 1_000_000,
+        backups: int = 3,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.explained: Set[str] = set()
+        self.logger = logging.getLogger("currency_bot.slow_queries")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+
+    def install(self, engine: AsyncEngine):
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        conn.info["slow_query_start"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        start = conn.info.pop("slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed < self.threshold:
+            return
+        key = shape(statement)
+        if many:
+            params = f"{len(parameters)} parameter sets"
+        else:
+            params = repr(parameters)[:200]
+        lines = [f"{elapsed * 1000:.1f}ms in {caller()}: {key} [{params}]"]
+        if key not in self.explained and len(self.explained) < MAX_SHAPES:
+            self.explained.add(key)
+            if key.split(" ", 1)[0].upper() in EXPLAINABLE:
+                first = parameters[0] if many else parameters
+                lines += self.explain(conn, statement, first)
+        self.logger.info("\n".join(lines))
+
+    def explain(self, conn, statement: str, parameters) -> list:
+        # A separate raw cursor, so the result rows still buffered on the
+        # statement's own cursor are left alone.
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                plan = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as e:
+            return [f"    (no plan: {e})"]
+        return [f"    {row[-1]}" for row in plan]
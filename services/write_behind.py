@@ -0,0 +1,356 @@
+import asyncio
+import contextvars
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from modals.bank import Bank
+from services.balances import Balances, _amounts, _chunks
+from services.dice import DiceRun, play
+
+Account = Tuple[int, int, int]
+
+
+class WriteBehindBalances(Balances):
+    # Opt-in (WRITE_BEHIND in config.json).  Balances live in memory and are
+    # authoritative; net deltas per account are group-committed to `bank`
+    # every `interval_ms` or `batch_size` operations, whichever comes first.
+    # At most `max_pending` operations can be lost on a crash: once that many
+    # are queued, mutations wait for a flush before applying.  Once flushed,
+    # the oldest clean amounts are dropped to keep at most `cache_size`.
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval_ms: int = 50,
+        batch_size: int = 500,
+        max_pending: int = 5000,
+        lock_stripes: int = 1024,
+        cache_size: int = 50000,
+    ):
+        super().__init__(engine, lock_stripes)
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self._amounts: Dict[Account, Optional[int]] = {}
+        # The accounts with changes not yet committed, by (guild, user) and
+        # by (guild, currency); only these differ from the bank table.
+        self._by_member: Dict[Tuple[int, int], Set[int]] = {}
+        self._by_currency: Dict[Tuple[int, int], Set[int]] = {}
+        self._pending: Dict[Account, int] = {}
+        # Bumped by forget(), so a read that raced it does not cache old rows.
+        self._epochs: Dict[int, int] = {}
+        self._ops = 0
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Write-behind flush failed, will retry: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending, ops, self._ops = self._pending, {}, self._ops, 0
+            statement = sqlite_insert(Bank)
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(
+                        statement.on_conflict_do_update(
+                            index_elements=[Bank.guild_id, Bank.currency_id, Bank.user_id],
+                            set_={"amount": Bank.amount + statement.excluded.amount},
+                        ),
+                        [
+                            {
+                                "guild_id": guild_id,
+                                "currency_id": currency_id,
+                                "user_id": user_id,
+                                "amount": delta,
+                            }
+                            for (guild_id, currency_id, user_id), delta in pending.items()
+                        ],
+                    )
+            except Exception:
+                for account, delta in pending.items():
+                    self._pending[account] = self._pending.get(account, 0) + delta
+                self._ops += ops
+                raise
+            for account in pending:
+                if account not in self._pending:
+                    self._clean(account)
+            self._evict()
+
+    def _cache(self, account: Account, amount: Optional[int]) -> Optional[int]:
+        return self._amounts.setdefault(account, amount)
+
+    def _dirty(self, account: Account):
+        guild_id, currency_id, user_id = account
+        self._by_member.setdefault((guild_id, user_id), set()).add(currency_id)
+        self._by_currency.setdefault((guild_id, currency_id), set()).add(user_id)
+
+    def _clean(self, account: Account):
+        guild_id, currency_id, user_id = account
+        for index, key, item in (
+            (self._by_member, (guild_id, user_id), currency_id),
+            (self._by_currency, (guild_id, currency_id), user_id),
+        ):
+            items = index.get(key)
+            if items is not None:
+                items.discard(item)
+                if not items:
+                    del index[key]
+
+    def _uncache(self, account: Account):
+        del self._amounts[account]
+        self._clean(account)
+
+    def _evict(self):
+        # Oldest first; queued accounts and ones a mutation holds stay.
+        excess = len(self._amounts) - self.cache_size
+        if excess <= 0:
+            return
+        evicted = []
+        for account in self._amounts:
+            if len(evicted) == excess:
+                break
+            if account not in self._pending and not self.locks.locked(account):
+                evicted.append(account)
+        for account in evicted:
+            del self._amounts[account]
+
+    def member_amounts(self, guild_id: int, user_id: int) -> Dict[int, Optional[int]]:
+        return {
+            currency_id: self._amounts[(guild_id, currency_id, user_id)]
+            for currency_id in self._by_member.get((guild_id, user_id), ())
+        }
+
+    def currency_amounts(
+        self, guild_id: int, currency_id: int
+    ) -> Dict[int, Optional[int]]:
+        return {
+            user_id: self._amounts[(guild_id, currency_id, user_id)]
+            for user_id in self._by_currency.get((guild_id, currency_id), ())
+        }
+
+    async def discard_currency(self, guild_id: int, currency_id: int):
+        for account in [a for a in self._pending if a[:2] == (guild_id, currency_id)]:
+            del self._pending[account]
+        for account in [a for a in self._amounts if a[:2] == (guild_id, currency_id)]:
+            self._uncache(account)
+        await self.flush()
+
+    async def forget(self, guild_id: int):
+        # Only called by rewrite(), which flushed the guild and keeps its
+        # mutations waiting, so none of the amounts dropped here is pending.
+        self._epochs[guild_id] = self._epochs.get(guild_id, 0) + 1
+        for account in [a for a in self._amounts if a[0] == guild_id]:
+            self._uncache(account)
+
+    async def close(self):
+        # Cancelling mid-flush could leave a write transaction open, so the
+        # task is asked to finish its current batch and stop instead.
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _load(self, account: Account) -> Optional[int]:
+        if account in self._amounts:
+            return self._amounts[account]
+        epoch = self._epochs.get(account[0], 0)
+        amount = await super().get(*account)
+        if self._epochs.get(account[0], 0) != epoch:
+            return amount
+        return self._cache(account, amount)
+
+    async def _load_many(
+        self, guild_id: int, currency_id: int, user_ids: List[int], chunk_size: int
+    ):
+        missing = [
+            user_id
+            for user_id in user_ids
+            if (guild_id, currency_id, user_id) not in self._amounts
+        ]
+        async with self.engine.connect() as conn:
+            for chunk in _chunks(missing, chunk_size):
+                amounts = await _amounts(conn, guild_id, currency_id, chunk)
+                for user_id in chunk:
+                    self._cache((guild_id, currency_id, user_id), amounts.get(user_id))
+
+    async def _reserve(self):
+        if self._task is None:
+            # The first command to write starts the flusher; an empty
+            # context keeps later flushes out of that command's metrics.
+            self._task = asyncio.create_task(
+                self._run(), context=contextvars.Context()
+            )
+        if self._ops >= self.max_pending:
+            await self.flush()
+
+    def _apply(self, account: Account, old: Optional[int], new: int):
+        self._amounts[account] = new
+        self._dirty(account)
+        # Zero deltas are still queued so that new accounts get their row.
+        self._pending[account] = self._pending.get(account, 0) + new - (old or 0)
+        self._ops += 1
+        if self._ops >= self.batch_size:
+            self._wake.set()
+        self._notify(*account, new)
+
+    async def get(
+        self, guild_id: int, currency_id: int, user_id: int
+    ) -> Optional[int]:
+        return await self._load((guild_id, currency_id, user_id))
+
+    async def credit(
+        self, guild_id: int, currency_id: int, user_id: int, amount: int
+    ) -> int:
+        await self._reserve()
+        account = (guild_id, currency_id, user_id)
+        async with self.locks.hold(account):
+            old = await self._load(account)
+            self._apply(account, old, (old or 0) + amount)
+            self._log(guild_id, currency_id, None, user_id, amount, "print")
+            return self._amounts[account]  # type: ignore
+
+    async def remove(
+        self, guild_id: int, currency_id: int, user_id: int, amount: int
+    ) -> Optional[Tuple[int, bool]]:
+        await self._reserve()
+        account = (guild_id, currency_id, user_id)
+        async with self.locks.hold(account):
+            old = await self._load(account)
+            if old is None:
+                return None
+            self._apply(account, old, max(old - amount, 0))
+            self._log(guild_id, currency_id, user_id, None, min(old, amount), "remove")
+            return self._amounts[account], old < amount  # type: ignore
+
+    async def wager(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        bet: int,
+        won: bool,
+        roll: Optional[int] = None,
+    ) -> Optional[int]:
+        await self._reserve()
+        account = (guild_id, currency_id, user_id)
+        async with self.locks.hold(account):
+            old = await self._load(account)
+            if old is None or old < bet:
+                return None
+            self._apply(account, old, old + bet if won else old - bet)
+            self._log_wager(guild_id, currency_id, user_id, bet, won, roll)
+            return self._amounts[account]
+
+    async def wager_rolls(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_id: int,
+        bet: int,
+        rolls: List[int],
+        dice_win: int,
+        stop_on_loss: bool = False,
+        stop_below: Optional[int] = None,
+    ) -> Optional[DiceRun]:
+        await self._reserve()
+        account = (guild_id, currency_id, user_id)
+        async with self.locks.hold(account):
+            old = await self._load(account)
+            if old is None:
+                return None
+            run = play(old, bet, rolls, dice_win, stop_on_loss, stop_below)
+            if run.rolls:
+                self._apply(account, old, run.balance)
+                self._log_run(guild_id, currency_id, user_id, bet, run, dice_win)
+            return run
+
+    async def transfer(
+        self,
+        guild_id: int,
+        currency_id: int,
+        from_user_id: int,
+        to_user_id: int,
+        amount: int,
+    ) -> Optional[int]:
+        await self._reserve()
+        from_account = (guild_id, currency_id, from_user_id)
+        to_account = (guild_id, currency_id, to_user_id)
+        async with self.locks.hold(from_account, to_account):
+            await self._load(from_account)
+            await self._load(to_account)
+            # Re-read after the awaits; nothing below yields, so this is atomic.
+            from_amount = self._amounts[from_account]
+            if from_amount is None or from_amount < amount:
+                return None
+            self._apply(from_account, from_amount, from_amount - amount)
+            to_amount = self._amounts[to_account]
+            self._apply(to_account, to_amount, (to_amount or 0) + amount)
+            self._log(guild_id, currency_id, from_user_id, to_user_id, amount, "give")
+            return self._amounts[from_account]
+
+    async def credit_many(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_ids: List[int],
+        amount: int,
+        chunk_size: int = 500,
+    ) -> int:
+        # Applied in memory, then flushed straight away so the payout is
+        # committed as one batch instead of trickling out behind max_pending.
+        await self._reserve()
+        user_ids = list(dict.fromkeys(user_ids))
+        accounts = [(guild_id, currency_id, user_id) for user_id in user_ids]
+        async with self.locks.hold(*accounts):
+            await self._load_many(guild_id, currency_id, user_ids, chunk_size)
+            for account in accounts:
+                old = self._amounts[account]
+                self._apply(account, old, (old or 0) + amount)
+                self._log(guild_id, currency_id, None, account[2], amount, "print")
+        await self.flush()
+        return len(accounts)
+
+    async def remove_many(
+        self,
+        guild_id: int,
+        currency_id: int,
+        user_ids: List[int],
+        amount: int,
+        chunk_size: int = 500,
+    ) -> Tuple[int, int]:
+        await self._reserve()
+        user_ids = list(dict.fromkeys(user_ids))
+        accounts = [(guild_id, currency_id, user_id) for user_id in user_ids]
+        removed = clamped = 0
+        async with self.locks.hold(*accounts):
+            await self._load_many(guild_id, currency_id, user_ids, chunk_size)
+            for account in accounts:
+                old = self._amounts[account]
+                if old is None:
+                    continue
+                self._apply(account, old, max(old - amount, 0))
+                self._log(
+                    guild_id, currency_id, account[2], None, min(old, amount), "remove"
+                )
+                removed += 1
+                clamped += old < amount
+        await self.flush()
+        return removed, clamped
@@ -0,0 +1,59 @@
+import asyncio
+import types
+
+import discord
+
+from currency_bot import CurrencyBot
+
+
+def make_bot(tmp_path):
+    return CurrencyBot(
+        {
+            "DATABASE": str(tmp_path / "bot.db"),
+            "PREFIX": "!",
+            "WRITE_BEHIND": True,
+            "WRITE_BEHIND_INTERVAL_MS": 10,
+            "LEDGER_FLUSH_INTERVAL_MS": 10,
+            "SLOW_QUERY_MS": 0,
+            "SLOW_QUERY_LOG": str(tmp_path / "slow_queries.log"),
+        },
+        intents=discord.Intents.default(),
+    )
+
+
+def test_background_flushes_are_not_attributed_to_a_command(tmp_path):
+    bot = make_bot(tmp_path)
+
+    async def command():
+        interaction = types.SimpleNamespace(
+            extras={},
+            command=None,
+            type=discord.InteractionType.application_command,
+        )
+        stats = bot.metrics.begin("dice", interaction)
+        # The first write starts both flushers from inside this command.
+        await bot.balances.credit(1, 1, 1, 10)
+        queries = stats.queries
+        # Both flushers run while the command is still in progress.
+        await asyncio.sleep(0.2)
+        assert stats.queries == queries
+        bot.metrics.finish(interaction, False)
+
+    async def main():
+        await bot.init_database()
+        try:
+            await asyncio.create_task(command())
+        finally:
+            await bot.close()
+
+    asyncio.run(main())
+    for handler in bot.slow_queries.logger.handlers:
+        handler.flush()
+    log = (tmp_path / "slow_queries.log").read_text(encoding="utf-8")
+    flushes = [
+        line
+        for line in log.splitlines()
+        if "INSERT INTO bank" in line or "INSERT INTO transactions" in line
+    ]
+    assert flushes
+    assert all(" in background: " in line for line in flushes)